@@ -1,319 +1,30 @@
-import os
-import streamlit as st
-from dotenv import load_dotenv
-import speech_recognition as sr  # Added for speech recognition
-
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-
-# Import the text-to-speech and translation functions
-from text_to_speech_helper import text_to_speech
-from translation import translate_text
-
-load_dotenv()
-
-GRQO_API_KEY = os.getenv("GROQ_API_KEY")
-if not GRQO_API_KEY:
-    raise ValueError("GRQO API Key is missing! Please add it to the .env file.")
-
-# Initialize embedding model and database
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-db = Chroma(
-    collection_name="pharma_database",
-    embedding_function=embedding_model,
-    persist_directory='./pharma_db'
-)
-
-def format_docs(docs):
-    return "\n\n".join(doc.page_content for doc in docs)
-
-from langchain_core.runnables import RunnableLambda, RunnablePassthrough
-
-def run_rag_chain(query):
-    retriever = db.as_retriever(search_type="similarity", search_kwargs={'k': 5})
-    
-    # Retrieve the current active chat's conversation history
-    chat_history = "\n".join(st.session_state.chat_sessions[st.session_state.active_chat_id])
-    
-    PROMPT_TEMPLATE = f"""
-    You are 🤖 HealthMate, a highly knowledgeable and expert AI specializing in medical science. 
-    Provide expert advice on diseases, symptoms, treatments, tablets, and various drugs. Keep responses concise and relevant to the query.
-    Start the conversation with a greeting such as "How are you today?" or "How are you feeling today?".
-    If the user asks a question not related to medical science, respond politely with "I am not able to help you with that query."
-    Use a friendly tone and include emojis to engage the user.
-    Don't suggest any medication to the user. Even if they ask for medication, advise them to consult a doctor and follow the prescribed treatment.
-    If they ask about any medication, provide details without making suggestions.
-    And don't add any sentences about death, as that might make the user uncomfortable. Keep the conversation happy and comforting.
-    Suggest them to consult the doctor only if they have worse symptoms. And meanwhile suggest them to take basic medication that they can do at their home based on the symptoms.
-    Chat History:
-    {chat_history}
-
-    User 🧑: {{question}}
-    """
-    
-    prompt_template = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
-
-    chat_model = ChatGroq(
-        model="llama-3.3-70b-versatile",
-        api_key=GRQO_API_KEY,
-        temperature=1
-    )
-
-    output_parser = StrOutputParser()
-
-    # Use RunnableLambda to extract the "question" string and pass it to get_relevant_documents
-    rag_chain = (
-        {
-            "context": RunnableLambda(lambda inp: retriever.get_relevant_documents(inp["question"])) | format_docs,
-            "question": RunnablePassthrough()
-        }
-        | prompt_template
-        | chat_model
-        | output_parser
-    )
-
-    # Pass the query as a dict so that the chain receives {"question": query}
-    response = rag_chain.invoke({"question": query})
-    return response
-
-
-def recognize_speech():
-    """Capture speech from the microphone and return the recognized text."""
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        st.info("Listening... Please speak now!")
-        try:
-            audio = recognizer.listen(source, timeout=5)
-            text = recognizer.recognize_google(audio)
-            return text
-        except sr.UnknownValueError:
-            return "Could not understand the audio."
-        except sr.RequestError as e:
-            return f"Could not request results; {e}"
-
-def init_session():
-    """Initialize session state for multiple chats if not already set."""
-    if "chat_sessions" not in st.session_state:
-        st.session_state.chat_sessions = {}
-    if "active_chat_id" not in st.session_state:
-        st.session_state.active_chat_id = None
-    if "chat_counter" not in st.session_state:
-        st.session_state.chat_counter = 0
-    # We'll use a separate key for voice input rather than modifying query_bottom directly.
-    if "voice_input" not in st.session_state:
-        st.session_state.voice_input = ""
-
-def main():
-    st.set_page_config(page_title="HealthMate", page_icon=":microscope:")
-
-    init_session()
-
-    # Inject custom CSS for spacing and styling
-    st.markdown(
-        """
-        <style>
-        audio {
-            width: 300px !important;
-            margin-top: 10px;
-            margin-bottom: 5px;
-        }
-        .custom-title { 
-            font-size: 46px; 
-            text-align: center; 
-            font-weight: bold; 
-            font-family: Open Sans; 
-            background: -webkit-linear-gradient(rgb(188, 12, 241), rgb(212, 4, 4)); 
-            -webkit-background-clip: text; 
-            -webkit-text-fill-color: transparent; 
-        }
-        .title-container {
-            text-align: center;
-        }
-        .span { 
-            font-size: 62px; 
-        }
-        .message-container {
-            display: flex;
-            margin: 10px 0;
-            align-items: flex-start;
-        }
-        .message-container.bot {
-            justify-content: flex-start;
-        }
-        .message-container.user {
-            justify-content: flex-end;
-        }
-        .icon-container {
-            font-size: 42px;
-            line-height: 1;
-            margin: 0 8px;
-        }
-        .user-message {
-            background-color: #b5e550 !important;
-            color: black !important;
-            padding: 10px;
-            border-radius: 10px;
-            text-align: right;
-            width: fit-content;
-            max-width: 70%;
-        }
-        .bot-message {
-            background-color: #b3cde0 !important;
-            color: black !important;
-            padding: 10px;
-            border-radius: 10px;
-            text-align: left;
-            width: fit-content;
-            max-width: 70%;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-    # Title banner
-    st.markdown(
-        """
-        <div class="title-container">
-            <p class='span'><span class='custom-title'>HealthMate: Medical Knowledge Assistant</span></p>
-        </div>
-        """, 
-        unsafe_allow_html=True
-    )
-    
-    # Sidebar Section
-    with st.sidebar:
-        if st.button("Open New Chat"):
-            st.session_state.chat_counter += 1
-            new_chat_id = f"Chat {st.session_state.chat_counter}"
-            st.session_state.chat_sessions[new_chat_id] = []
-            st.session_state.active_chat_id = new_chat_id
-
-        if st.session_state.chat_sessions:
-            chat_ids = list(st.session_state.chat_sessions.keys())
-            selected_chat = st.radio(
-                "Previous Chat History", 
-                chat_ids, 
-                index=chat_ids.index(st.session_state.active_chat_id) if st.session_state.active_chat_id in chat_ids else 0
-            )
-            st.session_state.active_chat_id = selected_chat
-
-        # Language selection
-        languages = {
-            "en": "English",
-            "te": "తెలుగు",
-            "ta": "தமிழ்",
-            "kn": "ಕನ್ನಡ",
-            "ml": "മലയാളം",
-            "mr": "मराठी",
-            "es": "Español",
-            "fr": "Français",
-            "de": "Deutsch",
-            "hi": "हिन्दी",
-            "zh": "中文"
-        }
-        language_names = list(languages.values())
-        selected_language_name = st.selectbox("Select your language", language_names, index=0)
-        user_lang = [code for code, name in languages.items() if name == selected_language_name][0]
-
-        st.title("About HealthMate")
-        st.info(
-            "HealthMate is an AI-powered medical chatbot designed to provide insights on medical queries. "
-            "It helps users with symptoms, disease information, treatments, Drugs."
-        )
-        
-        st.title("⚠️Disclaimer")
-        st.warning(
-            "Please note: The information provided here is for general informational purposes only and "
-            "should not be taken as final advice. Always consult with a qualified healthcare provider for "
-            "any recommendations related to medication or treatment."
-        )
-        
-        
-    if not st.session_state.active_chat_id:
-        st.session_state.chat_counter += 1
-        st.session_state.active_chat_id = f"Chat {st.session_state.chat_counter}"
-        st.session_state.chat_sessions[st.session_state.active_chat_id] = []
-    
-    # Display conversation for the active chat session
-    current_conversation = st.session_state.chat_sessions[st.session_state.active_chat_id]
-    for i, chat_message in enumerate(current_conversation):
-        if chat_message.startswith("🧑:"):
-            user_text = chat_message.replace("🧑:", "").strip()
-            st.markdown(
-                f"""
-                <div class="message-container user">
-                    <div class="user-message">{user_text}</div>
-                    <div class="icon-container">🤓</div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-        elif chat_message.startswith("🤖"):
-            bot_text = chat_message.replace("🤖 HealthMate:", "").strip()
-            st.markdown(
-                f"""
-                <div class="message-container bot">
-                    <div class="icon-container">🤖</div>
-                    <div class="bot-message">{bot_text}</div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-            # Generate and play audio using the text-to-speech module
-            audio_path = text_to_speech(bot_text)
-            if audio_path:
-                with open(audio_path, "rb") as audio_file:
-                    audio_bytes = audio_file.read()
-                st.audio(audio_bytes, format="audio/mp3")
-                st.markdown("<div style='margin-bottom:10px;'></div>", unsafe_allow_html=True)
-                st.button(f"🔊 Listen", key=f"listen_{i}")
-                st.markdown("<div style='margin-bottom:20px;'></div>", unsafe_allow_html=True)
-
-    # Voice Input button
-    if st.button("🎤 Voice Input"):
-        spoken_text = recognize_speech()
-        # Store recognized text in a separate key
-        st.session_state.voice_input = spoken_text
-
-    # Chat Form
-    with st.form("chat_form", clear_on_submit=True):
-        # Prepopulate with voice_input if available; otherwise, leave it empty.
-        default_value = st.session_state.get("voice_input", "")
-        query = st.text_input("Type your question here...", key="query_bottom", value=default_value)
-        submitted = st.form_submit_button("Ask HealthMate")
-
-        if submitted:
-            if not query.strip():
-                st.warning("Please enter a valid question.")
-            else:
-                # Translate query if necessary
-                if user_lang != "en":
-                    translated_query = translate_text(query, "en")
-                else:
-                    translated_query = query
-                
-                with st.spinner("Thinking..."):
-                    english_response = run_rag_chain(query=translated_query)
-                
-                if user_lang != "en":
-                    final_response = translate_text(english_response, user_lang)
-                else:
-                    final_response = english_response
-                
-                # Append messages to chat session
-                st.session_state.chat_sessions[st.session_state.active_chat_id].append(f"🧑: {query}")
-                st.session_state.chat_sessions[st.session_state.active_chat_id].append(f"🤖 HealthMate: {final_response}")
-                
-                # Remove the voice input so that text input starts empty next time.
-                if "voice_input" in st.session_state:
-                    del st.session_state["voice_input"]
-                
-                # No need to modify query_bottom here; clear_on_submit will reset it.
-
-if __name__ == "__main__":
-    main()
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# The shared core lives in the repository root, next to this module's folder;
+# Streamlit re-runs this file on every interaction, so add it only once
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from healthmate import chat, prompts
+
+load_dotenv()
+
+PROMPT_TEMPLATE = prompts.QA_PROMPT
+
+ABOUT = (
+    "HealthMate is an AI-powered medical chatbot designed to provide insights on medical queries. "
+    "It helps users with symptoms, disease information, treatments, Drugs."
+)
+
+def answer_query(query, context, chat_history=None, chat_id=None):
+    return chat.answer_query(query, context, PROMPT_TEMPLATE, chat_history, chat_id)
+
+def main():
+    chat.run_chat_page("qa", "HealthMate: Medical Knowledge Assistant", PROMPT_TEMPLATE, ABOUT)
+
+if __name__ == "__main__":
+    main()
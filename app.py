@@ -0,0 +1,34 @@
+import os
+
+import streamlit as st
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# All three modules in one server process, so the embedding model, the Chroma
+# index, the LLM clients and the caches in the healthmate package are loaded once
+pages = [
+    st.Page(
+        os.path.join(ROOT, "1st Module - Medical Knowledge and Conversational Chatbot", "app.py"),
+        title="Medical Knowledge Assistant",
+        icon="🩺",
+        url_path="knowledge",
+        default=True,
+    ),
+    st.Page(
+        os.path.join(ROOT, "2nd Module - Medical Image Analysis Agent", "app.py"),
+        title="Medical Image Analysis",
+        icon="🔬",
+        url_path="imaging",
+    ),
+    st.Page(
+        os.path.join(ROOT, "3rd Module - Holistic Health Management", "app.py"),
+        title="Wellness & Lifestyle Coach",
+        icon="🌿",
+        url_path="wellness",
+    ),
+]
+
+st.navigation(pages).run()
@@ -0,0 +1,28 @@
+"""
+Serve the HTTP API (healthmate/api.py) against the fakes in fakes.py, with
+no API keys or network access, for client development and load tests.
+
+    python benchmarks/fake_api.py --port 8080
+"""
+import os
+import sys
+
+import fakes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    fakes.install()
+    os.environ.setdefault("GROQ_API_KEY", "fake-key")
+    os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+    os.environ.setdefault("HEALTHMATE_ASR_ENGINE", "vosk")
+    os.environ.setdefault("HEALTHMATE_VOSK_MODELS", fakes.vosk_models_dir(["en", "hi", "te", "ta", "kn", "ml", "mr"]))
+    sys.path.insert(0, ROOT)
+    from healthmate import api
+
+    api.main()
+
+
+if __name__ == "__main__":
+    main()
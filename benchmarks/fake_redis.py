@@ -0,0 +1,117 @@
+"""
+Stand-in for a Redis server, enough for healthmate/cache.py: PING, SELECT,
+GET, SET (EX/PX/NX), DEL, EXISTS, DBSIZE and FLUSHDB over the Redis
+protocol, with the data in memory. Lets the shared cache tier be exercised
+across several processes without installing Redis.
+
+    python benchmarks/fake_redis.py --port 6379
+    HEALTHMATE_CACHE=redis://127.0.0.1:6379/0 streamlit run app.py
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = {}
+        self.commands = 0
+
+    def _live(self, key):
+        item = self.items.get(key)
+        if item is not None and item[1] and item[1] < time.time():
+            del self.items[key]
+            return None
+        return item
+
+    def execute(self, args):
+        command = args[0].upper()
+        with self.lock:
+            self.commands += 1
+            if command in (b"PING", b"SELECT"):
+                return b"+PONG\r\n" if command == b"PING" else b"+OK\r\n"
+            if command == b"GET":
+                item = self._live(args[1])
+                if item is None:
+                    return b"$-1\r\n"
+                return [b"$%d\r\n" % len(item[0]), item[0], b"\r\n"]
+            if command == b"SET":
+                key, value, options = args[1], args[2], [arg.upper() for arg in args[3:]]
+                expires_at = 0
+                if b"PX" in options:
+                    expires_at = time.time() + int(options[options.index(b"PX") + 1]) / 1000
+                elif b"EX" in options:
+                    expires_at = time.time() + int(options[options.index(b"EX") + 1])
+                if b"NX" in options and self._live(key) is not None:
+                    return b"$-1\r\n"
+                self.items[key] = (value, expires_at)
+                return b"+OK\r\n"
+            if command in (b"DEL", b"EXISTS"):
+                found = sum(self._live(key) is not None for key in args[1:])
+                if command == b"DEL":
+                    for key in args[1:]:
+                        self.items.pop(key, None)
+                return b":%d\r\n" % found
+            if command == b"DBSIZE":
+                return b":%d\r\n" % len(self.items)
+            if command == b"FLUSHDB":
+                self.items.clear()
+                return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command, as typed into telnet
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            if not args:
+                continue
+            reply = self.server.store.execute(args)
+            self.wfile.write(b"".join(reply) if isinstance(reply, list) else reply)
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, Handler)
+        self.store = Store()
+
+
+def start(port=0, host="127.0.0.1"):
+    """Serve from a background thread; returns the server (its URL is redis://host:server.server_address[1])."""
+    server = Server((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory stand-in for a Redis server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    server = Server((args.host, args.port))
+    print(f"Serving on redis://{args.host}:{server.server_address[1]}/0")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Deterministic local stand-ins for the remote services HealthMate calls
+(Groq, Gemini, Google Translate, gTTS and Google Scholar), plus an
+in-memory retriever in place of the HuggingFace model and Chroma index
+and a Vosk recognizer in place of the offline speech models.
+
+install() puts them in sys.modules, so it has to run before a module's
+app.py is imported. Every fake sleeps for the latency configured in
+LATENCY, which run_bench.py sets from the command line.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+
+# Simulated round-trip time (seconds) of each backend
+LATENCY = {
+    "llm": 0.3,
+    "vision": 1.0,
+    # Local vision model: seconds per decoding step, plus per row of the batch in that step
+    "vision_step": 0.02,
+    "vision_row": 0.004,
+    "translate": 0.08,
+    "tts": 0.15,
+    "scholar": 0.4,
+    "retrieve": 0.01,
+    # Seconds of compute per second of audio (the real-time factor of a small Vosk model)
+    "asr": 0.1,
+}
+
+# Rough size of an mp3 produced by gTTS per character of input
+TTS_BYTES_PER_CHAR = 64
+
+CALLS = {}
+_calls_lock = threading.Lock()
+
+
+def _count(name):
+    with _calls_lock:
+        CALLS[name] = CALLS.get(name, 0) + 1
+
+
+def _call(backend):
+    _count(backend)
+    time.sleep(LATENCY[backend])
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+
+
+class FakeChatGroq:
+    def __init__(self, model="llama-3.3-70b-versatile", api_key=None, temperature=0, **kwargs):
+        self.model_name = model
+
+    def _reply(self, prompt_value):
+        prompt = prompt_value.to_string() if hasattr(prompt_value, "to_string") else str(prompt_value)
+        content = f"Answer {_digest(prompt)}: stay hydrated, rest well and consult a doctor if it gets worse. 😊"
+        usage = {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        return content, usage
+
+    def invoke(self, prompt_value):
+        from langchain_core.messages import AIMessage
+
+        _call("llm")
+        content, usage = self._reply(prompt_value)
+        return AIMessage(content=content, usage_metadata=usage)
+
+    def stream(self, prompt_value):
+        """Yield the reply word by word, spreading the latency over the chunks."""
+        from langchain_core.messages import AIMessageChunk
+
+        _count("llm")
+        content, usage = self._reply(prompt_value)
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(LATENCY["llm"] / len(words))
+            last = i == len(words) - 1
+            yield AIMessageChunk(
+                content=word if last else word + " ",
+                usage_metadata=usage if last else None,
+            )
+
+
+class FakeGoogleTranslator:
+    def __init__(self, source="auto", target="en", **kwargs):
+        self.source = source
+        self.target = target
+
+    def translate(self, text, **kwargs):
+        _call("translate")
+        if self.source == "auto":
+            # The real service detects the source language as an extra step
+            _count("translate_autodetect")
+        if self.target == "en":
+            return text
+        return f"[{self.target}] {text}"
+
+
+class FakeGTTS:
+    def __init__(self, text, lang="en", slow=False, **kwargs):
+        self.text = text
+        self.lang = lang
+        self.slow = slow
+
+    def _audio(self):
+        _call("tts")
+        size = len(self.text) * TTS_BYTES_PER_CHAR * (2 if self.slow else 1)
+        return b"ID3" + b"\x00" * max(size - 3, 0)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self._audio())
+
+    def write_to_fp(self, fp):
+        fp.write(self._audio())
+
+
+def fake_search_pubs(query):
+    _call("scholar")
+    for i in range(10):
+        yield {
+            "bib": {"title": f"Study {i} on {query}", "pub_year": str(2015 + i)},
+            "pub_url": f"https://example.org/pubs/{_digest(query)}/{i}",
+        }
+
+
+class FakeRunResponse:
+    def __init__(self, content):
+        self.content = content
+        self.metrics = {"input_tokens": [1800], "output_tokens": [len(content) // 4]}
+
+
+class FakeGemini:
+    def __init__(self, id="gemini-2.0-flash-exp", api_key=None, **kwargs):
+        self.id = id
+
+
+class FakeAgent:
+    def __init__(self, model=None, markdown=True, **kwargs):
+        self.model = model
+
+    def run(self, message, images=None, **kwargs):
+        _call("vision")
+        images = images or []
+        content = (
+            "### 1. Image Type & Region\n- Chest X-ray, PA view\n\n"
+            "### 2. Key Findings\n- No acute abnormality\n- Severity: Normal\n\n"
+            "### 3. Diagnostic Assessment\n- Normal study (high confidence)\n\n"
+            f"### 4. Patient-Friendly Explanation\n- The {len(images)} image(s) look healthy.\n"
+        )
+        return FakeRunResponse(content)
+
+
+class FakeTinyVisionModel:
+    """
+    Stand-in for the local vision model behind vision.LocalBackend: decodes
+    a fixed report one word per step for every row of the batch at once, so
+    a step costs a little more per row but much less than running rows alone.
+    """
+
+    REPORT = (
+        "### 1. Image Type & Region\n- Chest X-ray, PA view\n\n"
+        "### 2. Key Findings\n- No acute abnormality\n- Severity: Normal\n\n"
+        "### 3. Diagnostic Assessment\n- Normal study (high confidence)\n\n"
+        "### 4. Patient-Friendly Explanation\n- The image(s) look healthy.\n"
+    )
+
+    def generate(self, requests, on_piece):
+        for _ in requests:
+            _count("vision")
+        words = self.REPORT.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(LATENCY["vision_step"] + LATENCY["vision_row"] * len(requests))
+            for row in range(len(requests)):
+                on_piece(row, word if i == 0 else " " + word)
+        return [
+            types.SimpleNamespace(content=self.REPORT, input_tokens=1800 * len(images), output_tokens=len(words))
+            for _, images in requests
+        ]
+
+
+class FakeDocument:
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class FakeRetriever:
+    def __init__(self, k, model_name=None):
+        self.k = k
+        self.model_name = model_name or ""
+
+    def get_relevant_documents(self, query):
+        _count("retrieve")
+        # The multilingual MiniLM has twice the layers of the English one
+        time.sleep(LATENCY["retrieve"] * (2 if "multilingual" in self.model_name else 1))
+        return [
+            FakeDocument(f"Passage {i} about {query}: symptoms, causes and home care.", {"page": i})
+            for i in range(self.k)
+        ]
+
+    invoke = get_relevant_documents
+
+
+class FakeEmbeddings:
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+
+class FakeChroma:
+    def __init__(self, collection_name=None, embedding_function=None, persist_directory=None, **kwargs):
+        self.collection_name = collection_name
+        self.embedding_function = embedding_function
+
+    def as_retriever(self, search_type="similarity", search_kwargs=None):
+        model_name = getattr(self.embedding_function, "model_name", None)
+        return FakeRetriever((search_kwargs or {}).get("k", 4), model_name)
+
+
+class FakeVoskModel:
+    def __init__(self, path):
+        self.path = path
+
+
+class FakeKaldiRecognizer:
+    """Emits one word per quarter second of audio and ends a segment every second."""
+
+    def __init__(self, model, sample_rate):
+        self.sample_rate = sample_rate
+        self.words = []
+        self.chunks = 0
+
+    def AcceptWaveform(self, data):
+        if not self.chunks:
+            _count("asr")
+        self.chunks += 1
+        time.sleep(LATENCY["asr"] * len(data) / 2 / self.sample_rate)
+        self.words.append(f"word{self.chunks}")
+        return self.chunks % 4 == 0
+
+    def _take(self):
+        text, self.words = " ".join(self.words), []
+        return text
+
+    def Result(self):
+        return json.dumps({"text": self._take()})
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(self.words)})
+
+    def FinalResult(self):
+        return json.dumps({"text": self._take()})
+
+
+def vosk_models_dir(languages):
+    """A scratch folder with an (empty) model folder per language, as VoskEngine expects."""
+    directory = tempfile.mkdtemp(prefix="healthmate-vosk-")
+    for language in languages:
+        os.makedirs(os.path.join(directory, language))
+    return directory
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def install(fake_retrieval=True):
+    """Replace the remote backends (and optionally retrieval) with the fakes above."""
+    _module("langchain_groq", ChatGroq=FakeChatGroq)
+    _module("deep_translator", GoogleTranslator=FakeGoogleTranslator)
+    _module("gtts", gTTS=FakeGTTS)
+    _module("vosk", Model=FakeVoskModel, KaldiRecognizer=FakeKaldiRecognizer)
+    _module("scholarly", scholarly=types.SimpleNamespace(search_pubs=fake_search_pubs))
+    phi = _module("phi")
+    phi.agent = _module("phi.agent", Agent=FakeAgent)
+    phi.model = _module("phi.model")
+    phi.model.google = _module("phi.model.google", Gemini=FakeGemini)
+    if fake_retrieval:
+        if importlib.util.find_spec("langchain_community") is None:
+            _module("langchain_community")
+        _module("langchain_community.embeddings", HuggingFaceEmbeddings=FakeEmbeddings)
+        _module("langchain_community.vectorstores", Chroma=FakeChroma)
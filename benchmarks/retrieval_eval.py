@@ -0,0 +1,91 @@
+"""
+Compare the two retrieval flows for non-English queries on the real
+indexes: "english" (translate, then search pharma_db) and "multilingual"
+(search pharma_db_multilingual with the original query while the
+translation runs alongside).
+
+For every query in multilingual_queries.json the reference is the top k
+passages the English index returns for the English wording. recall@k is
+the share of those a flow finds from the translated query; latency is the
+time until the prompt has both its English query and its passages. Needs
+both indexes (see healthmate/indexing.py) and network access for the
+translation service.
+
+    python benchmarks/retrieval_eval.py --langs hi,te,ta --k 5 --output recall.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from run_bench import ROOT, summarize
+
+sys.path.insert(0, ROOT)
+
+from healthmate import rag, translation
+from healthmate.request_context import RequestContext
+
+QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "multilingual_queries.json")
+
+
+def top_k(query, retrieval, k):
+    return [doc.page_content for doc in rag.get_vector_store(retrieval).similarity_search(query, k=k)]
+
+
+def evaluate(queries, langs, k):
+    results = []
+    for retrieval in ("english", "multilingual"):
+        for lang in langs:
+            context = RequestContext.for_language(lang)
+            # Each flow pays for its own translations
+            translation.clear_cache()
+            latencies, recalls = [], []
+            for query in queries:
+                reference = set(top_k(query["en"], "english", k))
+                start = time.perf_counter()
+                english_query, _ = rag.prepare_query(query[lang], context, retrieval)
+                latencies.append(time.perf_counter() - start)
+                if english_query is None:
+                    print(f"Translation failed for {lang}: {query[lang]}")
+                    continue
+                found = top_k(english_query if retrieval == "english" else query[lang], retrieval, k)
+                recalls.append(len(reference.intersection(found)) / len(reference) if reference else 0.0)
+            results.append({
+                "retrieval": retrieval,
+                "lang": lang,
+                f"recall_at_{k}": round(sum(recalls) / len(recalls), 3) if recalls else None,
+                "prepare_latency": summarize(latencies),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of the English vs multilingual retrieval flows")
+    parser.add_argument("--queries", default=QUERIES, help="JSON list of {lang: query} objects with an 'en' entry")
+    parser.add_argument("--langs", default="hi,te,ta", help="comma-separated query languages to evaluate")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--output", default="-", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = json.load(f)
+    langs = [lang for lang in args.langs.split(",") if lang]
+    for lang in langs:
+        queries = [query for query in queries if lang in query]
+
+    # Load both models and indexes before timing anything
+    rag.get_vector_store("english")
+    rag.get_vector_store("multilingual")
+    results = evaluate(queries, langs, args.k)
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Sweep the retrieval settings of the RAG chain on the real corpus: chunk
+size and overlap, HNSW index parameters, k and similarity vs MMR search.
+For each combination it reports recall@k, MRR, query latency percentiles,
+the passages' size in the prompt and the index's memory, then names the
+cheapest combination that meets --min-recall.
+
+The labeled set maps a question to the passage that answers it. With
+--build-labels it is generated from the PDFs: sentences are sampled from
+the pages and each question keeps two thirds of its sentence's content
+words, so it is never a verbatim substring. Edit the file to replace them
+with questions users actually ask. A retrieved chunk answers a question
+when it contains at least half of the passage's word trigrams, so indexes
+with different chunk boundaries are scored alike.
+
+    python benchmarks/retrieval_sweep.py --pdfs research-papers --build-labels labels.json --count 200
+    python benchmarks/retrieval_sweep.py --pdfs research-papers --labels labels.json \\
+        --chunk-sizes 100,200,400 --overlaps 50,10 --k 3,5,8 --hnsw 16:100 --hnsw 32:200 \\
+        --index pharma_db --min-recall 0.8 --output sweep.json
+
+Needs the embedding model and chromadb (see healthmate/indexing.py).
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+from run_bench import ROOT, summarize
+
+sys.path.insert(0, ROOT)
+
+from healthmate import indexing, rag
+
+STOPWORDS = set(
+    "a an and are as at be been by can for from had has have in into is it its may of on or that the "
+    "their these this those to was were which with".split()
+)
+# A chunk answers a question if it holds at least this share of the passage's word trigrams
+ANSWER_SHARE = 0.5
+# Chroma's default when no hnsw:M is given
+DEFAULT_HNSW_M = 16
+
+
+def _trigrams(text):
+    words = re.findall(r"\w+", text.casefold())
+    return {tuple(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+
+def pseudo_question(sentence, rng):
+    """Two thirds of a sentence's content words, in order."""
+    words = [word.strip(".,;:()[]\"'") for word in sentence.split()]
+    content = [word for word in words if word and word.casefold() not in STOPWORDS]
+    keep = sorted(rng.sample(range(len(content)), min(len(content), max(3, len(content) * 2 // 3))))
+    return " ".join(content[i] for i in keep)
+
+
+def build_labels(pages, count, seed=0):
+    """Sample count sentences of 12-40 mostly alphabetic words from the pages and pose a question for each."""
+    rng = random.Random(seed)
+    candidates = []
+    for page in pages:
+        for sentence in re.split(r"(?<=[.!?])\s+", " ".join(page.page_content.split())):
+            words = sentence.split()
+            if 12 <= len(words) <= 40 and sum(word.isalpha() for word in words) >= 0.7 * len(words):
+                candidates.append((sentence, page.metadata))
+    return [
+        {
+            "question": pseudo_question(sentence, rng),
+            "passage": sentence,
+            "source": os.path.basename(str(metadata.get("source", ""))),
+            "page": metadata.get("page"),
+        }
+        for sentence, metadata in rng.sample(candidates, min(count, len(candidates)))
+    ]
+
+
+def evaluate(db, labels, k, search_type):
+    """recall@k, MRR, latency and passage size for one index, k and search type."""
+    retriever = db.as_retriever(search_type=search_type, search_kwargs=rag.search_kwargs(k, search_type))
+    latencies, hits, reciprocal_ranks, context_words = [], 0, 0.0, []
+    for label in labels:
+        start = time.perf_counter()
+        docs = retriever.invoke(label["question"])
+        latencies.append(time.perf_counter() - start)
+        passage = _trigrams(label["passage"])
+        context_words.append(sum(len(doc.page_content.split()) for doc in docs))
+        for rank, doc in enumerate(docs, 1):
+            if len(passage & _trigrams(doc.page_content)) >= ANSWER_SHARE * len(passage):
+                hits += 1
+                reciprocal_ranks += 1 / rank
+                break
+    return {
+        "k": k,
+        "search": search_type,
+        "recall_at_k": round(hits / len(labels), 3),
+        "mrr": round(reciprocal_ranks / len(labels), 3),
+        "context_words_mean": round(sum(context_words) / len(context_words), 1),
+        "latency": summarize(latencies),
+    }
+
+
+def index_stats(db, directory, hnsw_m):
+    """Chunk count, size on disk and an estimate of the memory the loaded index takes."""
+    chunks = len(db.get(include=[])["ids"])
+    dimensions = len(db.embeddings.embed_query("dimension probe"))
+    # float32 vectors plus about 2 * M neighbour ids per node in the HNSW graph
+    memory = chunks * (dimensions * 4 + 2 * hnsw_m * 8)
+    return {
+        "chunks": chunks,
+        "index_disk_mb": round(indexing.index_size(directory) / 2**20, 2),
+        "index_memory_mb": round(memory / 2**20, 2),
+    }
+
+
+def sweep(indexes, labels, ks, search_types):
+    results = []
+    for name, settings, db, directory, hnsw_m in indexes:
+        # The first query pays for loading the model and the HNSW graph
+        db.similarity_search(labels[0]["question"], k=1)
+        stats = index_stats(db, directory, hnsw_m)
+        for search_type in search_types:
+            for k in ks:
+                result = {"index": name, **settings, **stats, **evaluate(db, labels, k, search_type)}
+                results.append(result)
+                print(
+                    f"{name:28} {search_type:10} k={k:<3} recall@k {result['recall_at_k']:.3f}  "
+                    f"MRR {result['mrr']:.3f}  p95 {result['latency']['p95_ms']} ms",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def cheapest(results, min_recall):
+    """The passing result with the smallest prompt context, then the lowest p95 latency and memory."""
+    passing = [r for r in results if r["recall_at_k"] >= min_recall]
+    if not passing:
+        return None
+    return min(passing, key=lambda r: (r["context_words_mean"], r["latency"]["p95_ms"], r["index_memory_mb"]))
+
+
+def parse_list(value, cast=int):
+    return [cast(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall, MRR, latency and memory of retrieval settings")
+    parser.add_argument("--pdfs", metavar="DIR", help="research-paper PDFs to build labels and sweep indexes from")
+    parser.add_argument("--labels", metavar="FILE", help="labeled set of {question, passage} objects")
+    parser.add_argument("--build-labels", metavar="FILE", help="write a labeled set generated from --pdfs and exit")
+    parser.add_argument("--count", type=int, default=100, help="questions to generate")
+    parser.add_argument("--retrieval", choices=sorted(rag.EMBEDDING_MODELS), default="english")
+    parser.add_argument("--chunk-sizes", default=str(indexing.CHUNK_SIZE), help="comma-separated tokens per chunk")
+    parser.add_argument("--overlaps", default=str(indexing.CHUNK_OVERLAP), help="comma-separated tokens of overlap")
+    parser.add_argument("--hnsw", action="append", metavar="M:EF",
+                        help="HNSW max neighbours and search ef of the swept indexes (default: Chroma's)")
+    parser.add_argument("--index", action="append", default=[], metavar="DIR", help="existing index to evaluate as is")
+    parser.add_argument("--k", default="3,5,8", help="comma-separated k values")
+    parser.add_argument("--search", default="similarity,mmr", help="comma-separated search types")
+    parser.add_argument("--min-recall", type=float, default=0.8, help="quality bar for the recommendation")
+    parser.add_argument("--output", default="-", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    pages = indexing.load_pdf_pages(args.pdfs) if args.pdfs else []
+    if args.build_labels:
+        if not pages:
+            parser.error("--build-labels needs --pdfs")
+        with open(args.build_labels, "w", encoding="utf-8") as f:
+            json.dump(build_labels(pages, args.count), f, indent=2, ensure_ascii=False)
+        return
+    if args.labels:
+        with open(args.labels, encoding="utf-8") as f:
+            labels = json.load(f)
+    elif pages:
+        labels = build_labels(pages, args.count)
+    else:
+        parser.error("give --labels, or --pdfs to generate them")
+    if not pages and not args.index:
+        parser.error("nothing to sweep: give --pdfs to build indexes, or --index")
+
+    with tempfile.TemporaryDirectory(prefix="healthmate-sweep-") as scratch:
+        indexes = []
+        for directory in args.index:
+            db = indexing.open_index(directory, args.retrieval)
+            indexes.append((os.path.basename(os.path.normpath(directory)), {}, db, directory, DEFAULT_HNSW_M))
+        hnsw_settings = [tuple(int(part) for part in value.split(":")) for value in args.hnsw or []] or [None]
+        for chunk_size in parse_list(args.chunk_sizes) if pages else []:
+            for overlap in parse_list(args.overlaps):
+                if overlap >= chunk_size:
+                    continue
+                chunks = indexing.split_documents(pages, chunk_size, overlap)
+                for hnsw in hnsw_settings:
+                    name = f"chunk{chunk_size}-overlap{overlap}" + (f"-M{hnsw[0]}-ef{hnsw[1]}" if hnsw else "")
+                    directory = os.path.join(scratch, name)
+                    metadata = {"hnsw:M": hnsw[0], "hnsw:search_ef": hnsw[1]} if hnsw else None
+                    print(f"Indexing {len(chunks)} chunks into {name}", file=sys.stderr)
+                    db = indexing.build_index(chunks, args.retrieval, directory, metadata)
+                    settings = {"chunk_size": chunk_size, "chunk_overlap": overlap, "hnsw": metadata}
+                    indexes.append((name, settings, db, directory, hnsw[0] if hnsw else DEFAULT_HNSW_M))
+        results = sweep(indexes, labels, parse_list(args.k), parse_list(args.search, str))
+
+    best = cheapest(results, args.min_recall)
+    if best:
+        print(
+            f"Cheapest with recall@k >= {args.min_recall}: {best['index']} "
+            f"HEALTHMATE_RETRIEVAL_K={best['k']} HEALTHMATE_RETRIEVAL_SEARCH={best['search']}",
+            file=sys.stderr,
+        )
+    else:
+        print(f"No setting reached recall@k >= {args.min_recall}", file=sys.stderr)
+    text = json.dumps({"labels": len(labels), "results": results, "recommended": best}, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
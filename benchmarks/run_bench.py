@@ -0,0 +1,563 @@
+"""
+End-to-end benchmark for the HealthMate modules.
+
+Drives the real app code (answer_query, render_conversation, text_to_speech,
+translate_text, analyze_image, generate_pdf) against the deterministic fakes
+in fakes.py, with scripted multi-turn sessions run by concurrent users, and
+writes p50/p95/p99 latency, throughput, backend calls and peak RSS as JSON.
+
+    python benchmarks/run_bench.py qa --users 8 --turns 4 --lang te
+    python benchmarks/run_bench.py api --users 32 --max-inflight 16
+    python benchmarks/run_bench.py all --output bench.json
+    python benchmarks/run_bench.py compare old.json new.json
+"""
+import argparse
+import io
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import fakes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "qa": "1st Module - Medical Knowledge and Conversational Chatbot",
+    "scan": "2nd Module - Medical Image Analysis Agent",
+    "wellness": "3rd Module - Holistic Health Management",
+}
+
+SCRIPTS = {
+    "qa": [
+        "What are the symptoms of diabetes?",
+        "How is it diagnosed?",
+        "Which foods should I avoid?",
+        "Are there side effects of metformin?",
+        "When should I see a doctor?",
+    ],
+    "wellness": [
+        "Hi, I want to sleep better.",
+        "I am 31-35, male, and my routine is sedentary.",
+        "Can you suggest an evening routine?",
+        "What should I eat before bed?",
+        "How can I reduce stress at work?",
+    ],
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else None,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2) if samples else None,
+        "p95_ms": round(percentile(samples, 95) * 1000, 2) if samples else None,
+        "p99_ms": round(percentile(samples, 99) * 1000, 2) if samples else None,
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def memory_report():
+    """What the memory budget accounts for at the end of a run, after one enforcement pass."""
+    from healthmate import memory_budget, metrics
+
+    memory_budget.enforce()
+    evicted = metrics.snapshot()["counters"].get("memory_evicted_bytes_total", 0)
+    return {
+        "budget_mb": memory_budget.BUDGET_MB,
+        "pools_mb": {name: round(size / 2**20, 2) for name, size in sorted(memory_budget.usage().items())},
+        "evicted_mb": round(evicted / 2**20, 2),
+        "resident_mb": round((memory_budget.resident_bytes() or 0) / 2**20, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def install_fakes(fake_retrieval, retrieval="english"):
+    """Install the fakes and point every store at a scratch directory."""
+    fakes.install(fake_retrieval=fake_retrieval)
+    os.environ.setdefault("GROQ_API_KEY", "fake-key")
+    os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+    scratch_dir = tempfile.mkdtemp(prefix="healthmate-bench-")
+    os.environ.setdefault("HEALTHMATE_SESSION_STORE", f"sqlite:{os.path.join(scratch_dir, 'sessions.db')}")
+    os.environ.setdefault("HEALTHMATE_MEDIA_DIR", os.path.join(scratch_dir, "media"))
+    os.environ.setdefault("HEALTHMATE_MEDIA_PORT", "0")
+    os.environ.setdefault("HEALTHMATE_ANSWER_CACHE", os.path.join(scratch_dir, "answers.db"))
+    os.environ["HEALTHMATE_RETRIEVAL"] = retrieval
+    os.environ.setdefault("HEALTHMATE_ASR_ENGINE", "vosk")
+    os.environ.setdefault("HEALTHMATE_VOSK_MODELS", fakes.vosk_models_dir(["en", "hi", "te", "ta", "kn", "ml", "mr"]))
+
+
+def use_local_vision(max_batch):
+    """Serve scans from vision.LocalBackend, batching a tiny fake model instead of the real checkpoint."""
+    sys.path.insert(0, ROOT)
+    from healthmate import vision
+
+    vision.BACKEND = "local"
+    vision.BACKENDS["local"] = lambda: vision.LocalBackend(fakes.FakeTinyVisionModel(), max_batch=max_batch)
+
+
+def load_module(scenario, fake_retrieval, retrieval="english"):
+    """Install the fakes and import the scenario's module from its own folder."""
+    install_fakes(fake_retrieval, retrieval)
+    module_dir = os.path.join(ROOT, SCENARIOS[scenario])
+    os.chdir(module_dir)
+    sys.path[:0] = [module_dir, ROOT]
+    from streamlit.logger import set_log_level
+
+    # Streamlit warns about the missing ScriptRunContext on every call in bare mode
+    set_log_level("error")
+    import app
+    from healthmate import metrics
+    return app, metrics
+
+
+def start_api(fake_retrieval, retrieval, max_inflight):
+    """Serve the HTTP API on a free local port from a background thread; return its URL."""
+    import asyncio
+
+    install_fakes(fake_retrieval, retrieval)
+    sys.path.insert(0, ROOT)
+    from aiohttp import web
+    from healthmate import api, metrics
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(api.create_app(max_inflight=max_inflight))
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = runner.addresses[0][1]
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}", metrics
+
+
+def api_user(base_url, script, turns, lang, samples, rejected):
+    """One client's session over HTTP, keeping its own history and retrying when shed."""
+    history = []
+    for i in range(turns):
+        query = script[i % len(script)]
+        body = json.dumps({"question": query, "language": lang, "history": history}).encode("utf-8")
+        start = time.perf_counter()
+        while True:
+            request = urllib.request.Request(
+                f"{base_url}/v1/qa", data=body, headers={"Content-Type": "application/json"}
+            )
+            try:
+                with urllib.request.urlopen(request) as response:
+                    answer = json.load(response)["answer"]
+                break
+            except urllib.error.HTTPError as e:
+                if e.code != 503:
+                    raise
+                rejected.append(1)
+                time.sleep(0.05)
+        samples["turn"].append(time.perf_counter() - start)
+        history += [{"role": "user", "content": query}, {"role": "bot", "content": answer}]
+
+
+def make_recording(seconds_of_speech=3.0, silence=1.0, rate=48000):
+    """A browser-like WAV: silence, a modulated tone standing in for speech, silence."""
+    import wave
+
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * seconds_of_speech)) / rate
+    speech = np.sin(2 * np.pi * 220 * t) * 8000 * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    quiet = rng.normal(0, 30, int(rate * silence))
+    samples = np.concatenate([quiet, speech, quiet]).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def voice_user(turns, lang, samples):
+    """One user recording voice questions, as the chat page transcribes them."""
+    from healthmate import voice
+
+    recording = make_recording()
+    for _ in range(turns):
+        first_partial = []
+        start = time.perf_counter()
+        future = voice.submit(
+            [voice.read_wav(recording)], lang,
+            lambda text: first_partial or first_partial.append(time.perf_counter()),
+        )
+        future.result()
+        done = time.perf_counter()
+        if first_partial:
+            samples["first_partial"].append(first_partial[0] - start)
+        samples["transcribe"].append(done - start)
+        samples["turn"].append(done - start)
+
+
+def chat_user(app, script, turns, lang, samples):
+    """
+    One user's scripted session: ask, store the turn, re-render the chat page
+    like a Streamlit rerun, then press "Listen" on the new reply.
+    """
+    from healthmate import chat
+    from healthmate.request_context import RequestContext
+    from healthmate.text_to_speech_helper import text_to_speech
+
+    store = chat.get_session_store()
+    chat_id = store.create_chat(f"bench-{threading.get_ident()}", "Chat 1")
+    context = RequestContext.for_language(lang)
+    for i in range(turns):
+        query = script[i % len(script)]
+        start = time.perf_counter()
+        # The module picks how much history (and which profile) goes into the prompt
+        response = app.answer_query(query, context, chat_id=chat_id)
+        answered = time.perf_counter()
+        if response is None:
+            # The page stores nothing for a failed turn either
+            continue
+        store.append(chat_id, "user", query, lang)
+        store.append(chat_id, "bot", response, lang)
+        messages, _ = chat.load_messages(chat_id, 1)
+        chat.render_conversation(messages)
+        rendered = time.perf_counter()
+        text_to_speech(response, context)
+        done = time.perf_counter()
+        samples["answer"].append(answered - start)
+        samples["rerun"].append(rendered - answered)
+        samples["listen"].append(done - rendered)
+        samples["turn"].append(done - start)
+
+
+class FakeUpload(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile."""
+
+    @property
+    def size(self):
+        return len(self.getvalue())
+
+
+def make_study(views):
+    """PNG views of one study: distinct noise images, with the last one a re-encoded copy of the first."""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(7)
+    frames = [rng.integers(0, 256, (768, 768), dtype=np.uint8) for _ in range(max(views - 1, 1))]
+    if views > 1:
+        # A repeated frame as exported by a scanner: same picture, a little sensor noise
+        frames.append(np.clip(frames[0].astype(np.int16) + rng.integers(-2, 3, (768, 768)), 0, 255).astype(np.uint8))
+    images = []
+    for frame in frames[:views]:
+        buffer = io.BytesIO()
+        Image.fromarray(frame).save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+def scan_user(app, turns, lang, samples, views=1):
+    from healthmate.pdf_generator import generate_pdf
+    from healthmate.request_context import RequestContext
+
+    if views > 1:
+        study = [FakeUpload(image_bytes) for image_bytes in make_study(views)]
+    else:
+        # A decodable image: the local vision backend opens it, unlike the remote model's fake
+        image_bytes = make_study(1)[0]
+    context = RequestContext.for_language(lang)
+    for _ in range(turns):
+        start = time.perf_counter()
+        if views > 1:
+            report = app.analyze_study(study, context)
+        else:
+            report = app.analyze_image(FakeUpload(image_bytes), context)
+        analyzed = time.perf_counter()
+        generate_pdf(report)
+        done = time.perf_counter()
+        samples["analyze"].append(analyzed - start)
+        samples["pdf"].append(done - analyzed)
+        samples["turn"].append(done - start)
+
+
+def warm_answers(questions, lang):
+    """Run the warm-up job on the script's questions, as a deploy would before taking traffic."""
+    from healthmate import answer_cache, warmup
+
+    warmer = warmup.Warmer(answer_cache.AnswerCache(answer_cache.PATH), sorted({"en", lang}))
+    # The script is typed as-is whatever the language, so that is the wording to warm
+    for question in questions:
+        warmer.warm(question, lang)
+
+
+def run_scenario(args):
+    rejected = []
+    if args.scenario == "api":
+        base_url, metrics = start_api(not args.real_retrieval, args.retrieval, args.max_inflight)
+        samples = {"turn": []}
+        target, extra = api_user, (base_url, SCRIPTS["qa"], args.turns, args.lang, samples, rejected)
+    elif args.scenario == "voice":
+        install_fakes(not args.real_retrieval, args.retrieval)
+        sys.path.insert(0, ROOT)
+        from healthmate import metrics
+
+        samples = {"first_partial": [], "transcribe": [], "turn": []}
+        target, extra = voice_user, (args.turns, args.lang, samples)
+    elif args.scenario == "scan":
+        if args.vision_backend == "local":
+            use_local_vision(args.vision_max_batch)
+        app, metrics = load_module(args.scenario, not args.real_retrieval, args.retrieval)
+        import streamlit as st
+
+        st.session_state["target_language"] = args.lang
+        st.session_state["tts_enabled"] = True
+        samples = {"analyze": [], "pdf": [], "turn": []}
+        target, extra = scan_user, (app, args.turns, args.lang, samples, args.views)
+    else:
+        app, metrics = load_module(args.scenario, not args.real_retrieval, args.retrieval)
+        samples = {"answer": [], "rerun": [], "listen": [], "turn": []}
+        target, extra = chat_user, (app, SCRIPTS[args.scenario], args.turns, args.lang, samples)
+        if args.warm and args.scenario == "qa":
+            warm_answers(SCRIPTS["qa"], args.lang)
+
+    metrics.reset()
+    fakes.CALLS.clear()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=target, args=extra) for _ in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    snapshot = metrics.snapshot()
+    total_turns = len(samples["turn"])
+    return {
+        "scenario": args.scenario,
+        "commit": git_commit(),
+        "config": {
+            "users": args.users,
+            "turns": args.turns,
+            "lang": args.lang,
+            "latency": fakes.LATENCY,
+            "real_retrieval": args.real_retrieval,
+            "retrieval": args.retrieval,
+            "max_inflight": args.max_inflight if args.scenario == "api" else None,
+            "warm": args.warm and args.scenario == "qa",
+            "views": args.views if args.scenario == "scan" else None,
+            "vision_backend": args.vision_backend if args.scenario == "scan" else None,
+            "vision_max_batch": args.vision_max_batch if args.scenario == "scan" and args.vision_backend == "local" else None,
+            "cache": os.getenv("HEALTHMATE_CACHE", "memory"),
+        },
+        "latency": {name: summarize(values) for name, values in samples.items()},
+        "throughput_turns_per_s": round(total_turns / wall, 3) if wall else None,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "memory": memory_report(),
+        # Requests the API turned away with 503 and the client retried
+        "rejected_per_turn": round(len(rejected) / total_turns, 3) if total_turns else None,
+        # Prompt size; with a profile instead of the full history it stays flat as chats grow
+        "llm_tokens_in_per_turn": round(snapshot["counters"].get("llm_tokens_in_total", 0) / total_turns, 1)
+        if total_turns else None,
+        "backend_calls_per_turn": {
+            name: round(count / total_turns, 3) for name, count in sorted(fakes.CALLS.items())
+        } if total_turns else {},
+        # Language round-trips per turn: remote translations, detections done by
+        # the translation service (source="auto") and local langdetect calls
+        "hops_per_turn": {
+            "translate": round(fakes.CALLS.get("translate", 0) / total_turns, 3),
+            "translate_autodetect": round(fakes.CALLS.get("translate_autodetect", 0) / total_turns, 3),
+            "local_detect": round(snapshot["stages"].get("tts.detect", {}).get("count", 0) / total_turns, 3),
+        } if total_turns else {},
+        "stages": {
+            stage: {"count": data["count"], "mean_ms": round(data["sum"] / data["count"] * 1000, 2)}
+            for stage, data in sorted(snapshot["stages"].items())
+        },
+        "counters": snapshot["counters"],
+    }
+
+
+def scenario_command(args, scenario, out_path):
+    """The command line that runs one scenario with args' settings in a child process."""
+    command = [
+        sys.executable, os.path.abspath(__file__), scenario,
+        "--users", str(args.users), "--turns", str(args.turns),
+        "--lang", args.lang, "--max-inflight", str(args.max_inflight), "--views", str(args.views),
+        "--vision-backend", args.vision_backend, "--vision-max-batch", str(args.vision_max_batch),
+        "--output", out_path,
+    ]
+    for name, value in fakes.LATENCY.items():
+        command += ["--latency", f"{name}={value}"]
+    if args.real_retrieval:
+        command.append("--real-retrieval")
+    if args.warm:
+        command.append("--warm")
+    if args.cache:
+        command += ["--cache", args.cache]
+    if args.memory_budget is not None:
+        command += ["--memory-budget", str(args.memory_budget)]
+    command += ["--retrieval", args.retrieval]
+    return command
+
+
+def run_all(args):
+    """Run each scenario in its own process so imports and peak RSS don't mix."""
+    results = []
+    for scenario in list(SCENARIOS) + ["api", "voice"]:
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            out_path = f.name
+        subprocess.run(scenario_command(args, scenario, out_path), check=True)
+        with open(out_path, encoding="utf-8") as f:
+            results.extend(json.load(f))
+        os.remove(out_path)
+    return results
+
+
+def run_replicas(args):
+    """
+    Run the scenario in several processes at once, sharing one cache server
+    (fake_redis.py) like replicas behind a load balancer.
+    """
+    import fake_redis
+
+    server = fake_redis.start()
+    args.cache = args.cache or f"redis://127.0.0.1:{server.server_address[1]}/0"
+    replicas = []
+    for _ in range(args.replicas):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            out_path = f.name
+        replicas.append((subprocess.Popen(scenario_command(args, args.scenario, out_path)), out_path))
+    results = []
+    for replica, (process, out_path) in enumerate(replicas):
+        if process.wait():
+            raise SystemExit(f"Replica {replica} failed")
+        with open(out_path, encoding="utf-8") as f:
+            for result in json.load(f):
+                result["config"]["replica"] = replica
+                results.append(result)
+        os.remove(out_path)
+    return results
+
+
+def compare(args):
+    """Print p95 deltas between two result files; exit 1 if any regressed beyond the threshold."""
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)}
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = {r["scenario"]: r for r in json.load(f)}
+
+    regressed = False
+    for scenario, new in candidate.items():
+        old = baseline.get(scenario)
+        if old is None:
+            continue
+        for name, stats in new["latency"].items():
+            before = old["latency"].get(name, {}).get("p95_ms")
+            after = stats["p95_ms"]
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            flag = ""
+            if change > args.threshold:
+                flag = "  REGRESSION"
+                regressed = True
+            print(f"{scenario:10} {name:8} p95 {before:10.1f} -> {after:10.1f} ms ({change:+.1%}){flag}")
+        print(f"{scenario:10} peak RSS {old['peak_rss_mb']} -> {new['peak_rss_mb']} MB")
+    return 1 if regressed else 0
+
+
+def parse_latency(values):
+    for value in values or []:
+        name, _, seconds = value.partition("=")
+        if name not in fakes.LATENCY:
+            raise SystemExit(f"Unknown backend '{name}', expected one of {sorted(fakes.LATENCY)}")
+        fakes.LATENCY[name] = float(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HealthMate end-to-end benchmark")
+    parser.add_argument("scenario", choices=list(SCENARIOS) + ["api", "voice", "all", "compare"])
+    parser.add_argument("files", nargs="*", help="baseline and candidate result files for 'compare'")
+    parser.add_argument("--users", type=int, default=4, help="concurrent users")
+    parser.add_argument("--turns", type=int, default=3, help="turns (or scans) per user")
+    parser.add_argument("--lang", default="en", help="language selected by every user")
+    parser.add_argument("--latency", action="append", metavar="BACKEND=SECONDS",
+                        help=f"override a fake backend latency, backends: {', '.join(fakes.LATENCY)}")
+    parser.add_argument("--real-retrieval", action="store_true",
+                        help="use the real embedding model and pharma_db instead of the fake retriever")
+    parser.add_argument("--max-inflight", type=int, default=64, help="API requests served at once for 'api'")
+    parser.add_argument("--retrieval", choices=["english", "multilingual"], default="english",
+                        help="translate before retrieval, or search the multilingual index with the original query")
+    parser.add_argument("--views", type=int, default=1,
+                        help="images per scan for 'scan'; more than one is analyzed as a study")
+    parser.add_argument("--vision-backend", choices=["gemini", "local"], default="gemini",
+                        help="vision backend for 'scan'; 'local' batches a tiny fake model through vision.LocalBackend")
+    parser.add_argument("--vision-max-batch", type=int, default=4,
+                        help="requests the local vision backend decodes together")
+    parser.add_argument("--warm", action="store_true",
+                        help="run the warm-up job on the Q&A script before 'qa' starts")
+    parser.add_argument("--cache", help="HEALTHMATE_CACHE for the run, e.g. disk:/tmp/cache or redis://host:port/0")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        help="HEALTHMATE_MEMORY_BUDGET_MB for the run, checked every second")
+    parser.add_argument("--replicas", type=int, default=1,
+                        help="run the scenario in this many processes sharing a fake_redis.py cache server")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed p95 regression for 'compare'")
+    parser.add_argument("--output", default="-", help="where to write the JSON results")
+    args = parser.parse_args()
+    parse_latency(args.latency)
+    if args.output != "-":
+        # Scenarios chdir into their module folder, so pin the path first
+        args.output = os.path.abspath(args.output)
+
+    if args.scenario == "compare":
+        if len(args.files) != 2:
+            parser.error("compare needs a baseline and a candidate file")
+        args.baseline, args.candidate = args.files
+        sys.exit(compare(args))
+
+    if args.cache:
+        os.environ["HEALTHMATE_CACHE"] = args.cache
+    if args.memory_budget is not None:
+        os.environ["HEALTHMATE_MEMORY_BUDGET_MB"] = str(args.memory_budget)
+        os.environ.setdefault("HEALTHMATE_MEMORY_CHECK_SECONDS", "1")
+    if args.scenario == "all":
+        results = run_all(args)
+    elif args.replicas > 1:
+        results = run_replicas(args)
+    else:
+        results = [run_scenario(args)]
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+Shared core of the HealthMate modules: the RAG chain, chat page, session
+and media stores, translation, text-to-speech and metrics. Everything that
+holds a model, client or cache is created once per process, so the three
+modules running in one server share a single footprint.
+"""
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,133 @@
+"""
+Answers precomputed by healthmate.warmup for popular opening questions, in
+every language they were warmed for. Entries are keyed by the question as
+the user types it and by a version derived from the prompt, the LLM and the
+retrieval index, so a deploy that changes any of them stops seeing stale
+answers without anything having to be deleted. The warm-up also publishes
+them to the shared cache tier, so replicas without the file see them too.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from healthmate import ROOT, metrics, rag
+from healthmate.cache import get_cache, text_key
+
+PATH = os.getenv("HEALTHMATE_ANSWER_CACHE", os.path.join(ROOT, "answer_cache.db"))
+
+
+def index_fingerprint(directory):
+    """Where the index is and when its Chroma database last changed, so a rebuilt or compacted index counts as new."""
+    directory = os.path.abspath(directory)
+    try:
+        stat = os.stat(os.path.join(directory, "chroma.sqlite3"))
+    except OSError:
+        return directory
+    return f"{directory}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def cache_version(prompt_template):
+    """Everything that changes the answer to a question asked without history."""
+    retrieval = rag.RETRIEVAL
+    parts = (
+        prompt_template, rag.LLM_MODEL, retrieval, rag.EMBEDDING_MODELS.get(retrieval, ""),
+        str(rag.RETRIEVAL_K), rag.SEARCH_TYPE, index_fingerprint(rag.INDEX_DIRS.get(retrieval, "")),
+    )
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def normalize(question):
+    """Case, spacing and trailing punctuation don't make a different question."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.!。？！ ").casefold()
+
+
+class AnswerCache:
+    """Warmed answers in a SQLite file, written by the warm-up job and read by the apps."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answers (
+                    version TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (version, language, question)
+                )
+                """
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, version, language, question):
+        row = self._connection().execute(
+            "SELECT answer FROM answers WHERE version = ? AND language = ? AND question = ?",
+            (version, language, normalize(question)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, version, language, question, answer):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (version, language, question, answer, created_at) VALUES (?, ?, ?, ?, ?)",
+                (version, language, normalize(question), answer, time.time()),
+            )
+
+    def prune(self, keep_versions):
+        """Drop the answers of every version not in keep_versions and return how many went."""
+        placeholders = ",".join("?" * len(keep_versions))
+        with self._connection() as conn:
+            cursor = conn.execute(f"DELETE FROM answers WHERE version NOT IN ({placeholders})", list(keep_versions))
+        return cursor.rowcount
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """The warmed answers, or None while no warm-up has written the cache file."""
+    global _cache
+    with _cache_lock:
+        if _cache is None and os.path.exists(PATH):
+            _cache = AnswerCache(PATH)
+        return _cache
+
+
+def shared_key(version, language, question):
+    return text_key("answer", version, language, normalize(question))
+
+
+def publish(version, language, question, answer):
+    """Make a warmed answer visible to every replica through the cache tier."""
+    get_cache().set(shared_key(version, language, question), answer.encode("utf-8"))
+
+
+def lookup(prompt_template, context, question):
+    """The warmed answer to an opening question in the user's language, or None."""
+    version = cache_version(prompt_template)
+    answer = None
+    cache = get_answer_cache()
+    if cache is not None:
+        try:
+            answer = cache.get(version, context.language, question)
+        except sqlite3.Error as e:
+            print(f"Error reading the answer cache: {e}")
+    if answer is None:
+        shared = get_cache().get(shared_key(version, context.language, question))
+        answer = bytes(shared).decode("utf-8") if shared is not None else None
+    metrics.incr("answer_cache_hits_total" if answer else "answer_cache_misses_total", lang=context.language)
+    return answer
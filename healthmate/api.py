@@ -0,0 +1,482 @@
+"""
+Headless HTTP API for the HealthMate modules, so other clients and a load
+balancer can use them without going through Streamlit.
+
+    POST /v1/qa        {"question": "...", "language": "te", "history": [...], "stream": false}
+    POST /v1/wellness  same body plus "profile", answered by the wellness coach
+    POST /v1/scan      image bytes as the body, ?language=te&format=json|pdf
+                       (or several views of one study as multipart/form-data)
+    POST /v1/transcribe audio as the body, ?language=te&rate=16000
+    GET  /healthz
+    GET  /metrics
+
+history is a list of {"role": "user" | "bot", "content": "..."}. With
+"stream": true the answer comes back as newline-delimited JSON, one
+{"delta": "..."} per piece and a final {"done": true, "answer": "..."};
+English answers are streamed as the model writes them, translated ones
+arrive in one piece. /v1/wellness also returns the user's "profile" as
+extracted so far; clients send it back with the next question and can keep
+"history" to the last few messages.
+
+/v1/transcribe takes raw 16-bit mono PCM at ?rate (the default, which can
+be uploaded in chunks and is recognized as it arrives) or a WAV file with
+Content-Type audio/wav, and streams {"partial": "..."} lines followed by
+{"done": true, "text": "..."}. Recognition runs in the speech worker pool
+of healthmate/voice.py, which is only taken once audio arrives; a streamed
+upload idle for HEALTHMATE_API_UPLOAD_IDLE_SECONDS is cut off. Audio over HEALTHMATE_API_MAX_UPLOAD_MB gets 413,
+or an {"error": ...} line if a chunked upload only grows past it once the
+transcript has started streaming.
+
+Blocking work runs in two bounded thread pools: "cpu" for embedding,
+retrieval and PDF rendering, "io" for the LLM, vision, translation and
+Scholar calls. Once max_inflight requests are being served, new ones are
+turned away with 503 and Retry-After rather than queueing without bound.
+
+    python -m healthmate.api --port 8080
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+import numpy as np
+from aiohttp import web
+from dotenv import load_dotenv
+from PIL import Image, UnidentifiedImageError
+
+from healthmate import answer_cache, metrics, prompts, rag, scan, voice, wellness
+from healthmate.pdf_generator import generate_pdf
+from healthmate.request_context import LANGUAGES, RequestContext
+from healthmate.session_store import ROLE_PREFIXES, Message, format_history
+from healthmate.translation import translate_text
+
+CPU_WORKERS = int(os.getenv("HEALTHMATE_API_CPU_WORKERS", str(os.cpu_count() or 2)))
+IO_WORKERS = int(os.getenv("HEALTHMATE_API_IO_WORKERS", "32"))
+MAX_INFLIGHT = int(os.getenv("HEALTHMATE_API_MAX_INFLIGHT", "64"))
+MAX_UPLOAD_MB = int(os.getenv("HEALTHMATE_API_MAX_UPLOAD_MB", "20"))
+# A streamed upload that sends nothing for this long is cut off, so it can't hold a recognition worker
+UPLOAD_IDLE_SECONDS = float(os.getenv("HEALTHMATE_API_UPLOAD_IDLE_SECONDS", "10"))
+
+CHAT_PROMPTS = {
+    "qa": prompts.QA_PROMPT,
+    "wellness": prompts.WELLNESS_PROMPT,
+}
+
+_DONE = object()
+
+
+class ApiState:
+    """Worker pools and the in-flight request count of one API server."""
+
+    def __init__(self, cpu_workers, io_workers, max_inflight):
+        self.cpu_pool = ThreadPoolExecutor(cpu_workers, thread_name_prefix="healthmate-cpu")
+        self.io_pool = ThreadPoolExecutor(io_workers, thread_name_prefix="healthmate-io")
+        self.max_inflight = max_inflight
+        self.inflight = 0
+
+    async def cpu(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.cpu_pool, partial(func, *args, **kwargs))
+
+    async def io(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.io_pool, partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        self.cpu_pool.shutdown(wait=False, cancel_futures=True)
+        self.io_pool.shutdown(wait=False, cancel_futures=True)
+
+
+STATE = web.AppKey("state", ApiState)
+
+
+def _error(status, message, **headers):
+    return web.json_response({"error": message}, status=status, headers=headers or None)
+
+
+class BadRequest(Exception):
+    pass
+
+
+@web.middleware
+async def admission(request, handler):
+    """Shed load beyond max_inflight and time every API request."""
+    if not request.path.startswith("/v1/"):
+        return await handler(request)
+    state = request.app[STATE]
+    # Label by path only for known routes, so stray URLs can't grow the metric set
+    endpoint = request.path if request.match_info.route.resource else "unmatched"
+    if state.inflight >= state.max_inflight:
+        metrics.incr("api_rejected_total", endpoint=endpoint)
+        return _error(503, "Server is busy, please retry shortly.", **{"Retry-After": "1"})
+
+    state.inflight += 1
+    metrics.set_gauge("api_inflight_requests", state.inflight)
+    start = time.perf_counter()
+    try:
+        return await handler(request)
+    except BadRequest as e:
+        return _error(400, str(e))
+    finally:
+        state.inflight -= 1
+        metrics.set_gauge("api_inflight_requests", state.inflight)
+        metrics.observe("healthmate_api_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("The request body must be JSON.")
+    if not isinstance(body, dict):
+        raise BadRequest("The request body must be a JSON object.")
+    return body
+
+
+def _context(language):
+    if not isinstance(language, str) or language not in LANGUAGES:
+        raise BadRequest(f"Unsupported language '{language}', expected one of {sorted(LANGUAGES)}.")
+    return RequestContext.for_language(language)
+
+
+def _history(items):
+    """Format client-side history ([{"role", "content"}, ...]) for the prompt."""
+    if not isinstance(items, list):
+        raise BadRequest("history must be a list of {role, content} objects.")
+    messages = []
+    for item in items:
+        if not isinstance(item, dict) or item.get("role") not in ROLE_PREFIXES:
+            raise BadRequest(f"history roles must be one of {sorted(ROLE_PREFIXES)}.")
+        messages.append(Message(None, item["role"], str(item.get("content", ""))))
+    return format_history(messages)
+
+
+def _profile(data):
+    if data is not None and not isinstance(data, dict):
+        raise BadRequest("profile must be an object.")
+    return wellness.Profile.from_dict(data)
+
+
+async def health(request):
+    state = request.app[STATE]
+    return web.json_response({"status": "ok", "inflight": state.inflight, "max_inflight": state.max_inflight})
+
+
+async def metrics_page(request):
+    return web.Response(text=metrics.render_prometheus(), content_type="text/plain")
+
+
+async def chat(request):
+    """Answer a question with the Q&A or wellness prompt."""
+    state = request.app[STATE]
+    module = request.match_info["module"]
+    prompt_template = CHAT_PROMPTS[module]
+    body = await _read_json(request)
+    question = str(body.get("question") or "").strip()
+    if not question:
+        raise BadRequest("Please enter a valid question.")
+    context = _context(body.get("language", "en"))
+    chat_history = _history(body.get("history", []))
+    profile = _profile(body.get("profile")) if module == "wellness" else None
+
+    if not chat_history and profile is None:
+        warmed = await state.cpu(answer_cache.lookup, prompt_template, context, question)
+        if warmed:
+            result = {"answer": warmed, "language": context.language, "cached": True}
+            if body.get("stream"):
+                return await _stream_lines(request, [{"delta": warmed}, dict(result, done=True)])
+            return web.json_response(result)
+
+    try:
+        if not context.needs_translation:
+            english_query = question
+            passages = await state.cpu(rag.retrieve_context, question)
+        elif rag.RETRIEVAL == "multilingual":
+            # The multilingual index takes the original query, so only the prompt waits for the translation
+            english_query, passages = await asyncio.gather(
+                state.io(translate_text, question, "en", source_language=context.language),
+                state.cpu(rag.retrieve_context, question),
+            )
+        else:
+            # The source language is known, so the provider needn't detect it
+            english_query = await state.io(translate_text, question, "en", source_language=context.language)
+            passages = await state.cpu(rag.retrieve_context, english_query) if english_query else ""
+    except Exception as e:
+        print(f"Error retrieving passages: {e}")
+        return _error(502, f"Error retrieving passages: {e}")
+    if english_query is None:
+        return _error(502, "Translation failed.")
+
+    variables, extra = {}, {}
+    if profile is not None:
+        profile = wellness.update_profile(profile, english_query)
+        extra["profile"] = profile.to_dict()
+        try:
+            variables = await state.io(wellness.prompt_variables, profile)
+        except Exception as e:
+            print(f"Error generating plan: {e}")
+            return _error(502, f"Error generating plan: {e}")
+
+    if body.get("stream") and not context.needs_translation:
+        return await _stream_answer(request, english_query, prompt_template, passages, chat_history, variables, extra)
+    try:
+        english_response = await state.io(
+            rag.generate_answer, english_query, prompt_template, passages, chat_history, **variables
+        )
+    except Exception as e:
+        print(f"Error answering query: {e}")
+        return _error(502, f"Error answering query: {e}")
+
+    answer, translated = english_response, context.needs_translation
+    if context.needs_translation:
+        translated_response = await state.io(translate_text, english_response, context.language, source_language="en")
+        if translated_response is None:
+            translated = False
+        else:
+            answer = translated_response
+
+    result = {"answer": answer, "language": context.language if translated else "en", **extra}
+    if body.get("stream"):
+        return await _stream_lines(request, [{"delta": answer}, dict(result, done=True)])
+    return web.json_response(result)
+
+
+def _ndjson(line):
+    return json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+async def _stream_lines(request, lines):
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+    for line in lines:
+        await response.write(_ndjson(line))
+    await response.write_eof()
+    return response
+
+
+async def _stream_answer(request, query, prompt_template, passages, chat_history, variables, extra):
+    """Relay the model's pieces from an io worker to the client as they arrive; extra goes in the last line."""
+    state = request.app[STATE]
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def produce():
+        try:
+            for piece in rag.stream_answer(query, prompt_template, passages, chat_history, **variables):
+                loop.call_soon_threadsafe(queue.put_nowait, piece)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    loop.run_in_executor(state.io_pool, produce)
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+    pieces = []
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                print(f"Error answering query: {item}")
+                line = {"error": f"Error answering query: {item}"}
+            else:
+                pieces.append(item)
+                line = {"delta": item}
+            await response.write(_ndjson(line))
+        await response.write(_ndjson({"done": True, "answer": "".join(pieces), "language": "en", **extra}))
+        await response.write_eof()
+    except ConnectionResetError:
+        # The client went away; the worker finishes the reply on its own
+        metrics.incr("api_client_disconnects_total")
+    return response
+
+
+async def _read_images(request):
+    """The image in the body, or every part of a multipart upload (the views of one study)."""
+    if request.content_type != "multipart/form-data":
+        image_bytes = await request.read()
+        return [image_bytes] if image_bytes else []
+    images, total = [], 0
+    reader = await request.multipart()
+    while (part := await reader.next()) is not None:
+        image_bytes = await part.read()
+        total += len(image_bytes)
+        if total > MAX_UPLOAD_MB * 1024 * 1024:
+            raise web.HTTPRequestEntityTooLarge(max_size=MAX_UPLOAD_MB * 1024 * 1024, actual_size=total)
+        if image_bytes:
+            images.append(image_bytes)
+    return images
+
+
+def _check_image(image_bytes):
+    """Reject an upload PIL can't read as an image; that is the client's mistake, not the backend's."""
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError) as e:
+        raise BadRequest(f"The upload is not a readable image: {e}")
+
+
+async def scan_image(request):
+    """Analyze the image (or study) in the request body and return the report as JSON or PDF."""
+    state = request.app[STATE]
+    context = _context(request.query.get("language", "en"))
+    output = request.query.get("format", "json")
+    if output not in ("json", "pdf"):
+        raise BadRequest("format must be 'json' or 'pdf'.")
+    images = await _read_images(request)
+    if not images:
+        raise BadRequest("Please upload a medical image as the request body.")
+    for image_bytes in images:
+        _check_image(image_bytes)
+
+    extra = {}
+    try:
+        if len(images) == 1:
+            report, translated = await state.io(scan.analyze_image, images[0], context)
+        else:
+            report, translated, extra["study"] = await state.io(scan.analyze_study, images, context)
+    except UnidentifiedImageError as e:
+        # Damage verify() doesn't catch shows up when the image is decoded
+        raise BadRequest(f"The upload is not a readable image: {e}")
+    except Exception as e:
+        print(f"Analysis error: {e}")
+        return _error(502, f"Analysis error: {e}")
+
+    if output == "pdf":
+        pdf_buffer = await state.cpu(generate_pdf, report)
+        return web.Response(body=pdf_buffer.getvalue(), content_type="application/pdf")
+    return web.json_response({"report": report, "language": context.language if translated else "en", **extra})
+
+
+async def transcribe(request):
+    """Recognize speech while the audio is still being uploaded, streaming the transcript so far."""
+    language = _context(request.query.get("language", "en")).language
+    try:
+        rate = int(request.query.get("rate", voice.SAMPLE_RATE))
+    except ValueError:
+        raise BadRequest("rate must be a sample rate in Hz.")
+    max_size = MAX_UPLOAD_MB * 1024 * 1024
+    if request.content_length is not None and request.content_length > max_size:
+        raise web.HTTPRequestEntityTooLarge(max_size=max_size, actual_size=request.content_length)
+    loop = asyncio.get_running_loop()
+    blocks = queue.Queue()
+    updates = asyncio.Queue()
+
+    def audio_blocks():
+        while True:
+            block = blocks.get()
+            if block is None:
+                return
+            yield block
+
+    recognition = loop.create_future()
+
+    def start_recognition():
+        # The worker blocks on the audio queue, so only take one once there is audio for it
+        if not recognition.done():
+            future = voice.submit(
+                audio_blocks(), language, lambda text: loop.call_soon_threadsafe(updates.put_nowait, text)
+            )
+            recognition.set_result(asyncio.wrap_future(future))
+
+    upload_errors = []
+
+    async def upload():
+        try:
+            if request.content_type in ("audio/wav", "audio/x-wav", "audio/wave"):
+                blocks.put(voice.read_wav(await request.read()))
+            else:
+                leftover, received = b"", 0
+                while True:
+                    try:
+                        data = await asyncio.wait_for(request.content.read(16384), UPLOAD_IDLE_SECONDS)
+                    except asyncio.TimeoutError:
+                        raise ValueError(f"No audio received for {UPLOAD_IDLE_SECONDS:g} seconds.")
+                    if not data:
+                        break
+                    # Chunked uploads have no Content-Length to check up front
+                    received += len(data)
+                    if received > max_size:
+                        raise ValueError(f"The audio is larger than {MAX_UPLOAD_MB} MB.")
+                    data = leftover + data
+                    usable = len(data) - len(data) % 2
+                    leftover = data[usable:]
+                    blocks.put(voice.resample(np.frombuffer(data[:usable], dtype="<i2"), rate))
+                    start_recognition()
+        except Exception as e:
+            upload_errors.append(e)
+        finally:
+            blocks.put(None)
+            start_recognition()
+
+    uploading = asyncio.ensure_future(upload())
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+    try:
+        finished = await recognition
+        while not finished.done():
+            getter = asyncio.ensure_future(updates.get())
+            await asyncio.wait([getter, finished], return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                await response.write(_ndjson({"partial": getter.result()}))
+            else:
+                getter.cancel()
+        # Partials are queued before the result, so whatever is left came earlier
+        while not updates.empty():
+            await response.write(_ndjson({"partial": updates.get_nowait()}))
+        await uploading
+        try:
+            if upload_errors:
+                raise upload_errors[0]
+            final = {"done": True, "text": finished.result()}
+        except Exception as e:
+            print(f"Error transcribing audio: {e}")
+            final = {"error": f"Error transcribing audio: {e}"}
+        await response.write(_ndjson(final))
+        await response.write_eof()
+    except ConnectionResetError:
+        metrics.incr("api_client_disconnects_total")
+        uploading.cancel()
+    return response
+
+
+def create_app(cpu_workers=CPU_WORKERS, io_workers=IO_WORKERS, max_inflight=MAX_INFLIGHT):
+    app = web.Application(middlewares=[admission], client_max_size=MAX_UPLOAD_MB * 1024 * 1024)
+    state = ApiState(cpu_workers, io_workers, max_inflight)
+    app[STATE] = state
+
+    async def close_pools(app):
+        state.shutdown()
+
+    app.on_cleanup.append(close_pools)
+    app.add_routes([
+        web.get("/healthz", health),
+        web.get("/metrics", metrics_page),
+        web.post("/v1/{module:qa|wellness}", chat),
+        web.post("/v1/scan", scan_image),
+        web.post("/v1/transcribe", transcribe),
+    ])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HealthMate HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--cpu-workers", type=int, default=CPU_WORKERS, help="threads for embedding, retrieval and PDFs")
+    parser.add_argument("--io-workers", type=int, default=IO_WORKERS, help="threads for remote model and API calls")
+    parser.add_argument("--max-inflight", type=int, default=MAX_INFLIGHT, help="requests served at once before 503")
+    args = parser.parse_args()
+
+    load_dotenv()
+    web.run_app(create_app(args.cpu_workers, args.io_workers, args.max_inflight), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+"""
+Cache tier shared by translation, speech, warmed answers and wellness plans,
+so replicas behind a load balancer reuse each other's work. Values are
+bytes; callers encode their own.
+
+HEALTHMATE_CACHE selects the backend:
+    memory            in-process LRU (default; nothing is shared)
+    disk:<dir>        files in a directory, shared by processes on one host or a shared volume,
+                      bounded by HEALTHMATE_DISK_CACHE_MB
+    redis://host:port/db
+                      any Redis-compatible server, shared by every replica; a small
+                      in-process cache sits in front of it
+
+get_or_compute() coalesces misses: while one caller computes a key, others
+in the process wait on a lock and others in the cluster wait on a lease
+key in the backend, then read the stored value instead of computing it too.
+"""
+import hashlib
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from healthmate import memory_budget, metrics
+
+MEMORY_CACHE_MB = int(os.getenv("HEALTHMATE_MEMORY_CACHE_MB", "64"))
+NEAR_CACHE_MB = int(os.getenv("HEALTHMATE_NEAR_CACHE_MB", "16"))
+DISK_CACHE_MB = int(os.getenv("HEALTHMATE_DISK_CACHE_MB", "1024"))
+# How often a disk cache under its budget still removes expired files
+DISK_SWEEP_SECONDS = 300
+# How long a computation may hold its lease before others give up waiting and compute themselves
+LEASE_SECONDS = 60
+LEASE_POLL_SECONDS = 0.05
+
+
+def _namespace(key):
+    return key.split(":", 1)[0]
+
+
+class MemoryBackend:
+    """
+    LRU of values in process memory, bounded by their total size. Items are
+    [value, expires at, last used], oldest use first.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at, _ = item
+            now = time.time()
+            if expires_at and expires_at < now:
+                self._remove(key)
+                return None
+            item[2] = now
+            self._items.move_to_end(key)
+            return value
+
+    def _remove(self, key):
+        value = self._items.pop(key)[0]
+        self.size -= len(value)
+
+    def _set(self, key, value, ttl):
+        if key in self._items:
+            self._remove(key)
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        self._items[key] = [value, now + ttl if ttl else 0, now]
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._items)))
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        """Set key only if it is absent; True if this call set it."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and not (item[1] and item[1] < time.time()):
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def evict(self, nbytes):
+        """Drop least recently used values until nbytes are freed; returns the bytes freed."""
+        freed = 0
+        with self._lock:
+            while self._items and freed < nbytes:
+                key = next(iter(self._items))
+                freed += len(self._items[key][0])
+                self._remove(key)
+        return freed
+
+    def evict_idle(self, max_idle):
+        """Drop values unused for max_idle seconds or past their TTL; returns the bytes freed."""
+        now = time.time()
+        freed = 0
+        with self._lock:
+            for key, (value, expires_at, last_used) in list(self._items.items()):
+                if now - last_used >= max_idle or (expires_at and expires_at < now):
+                    freed += len(value)
+                    self._remove(key)
+        return freed
+
+
+class DiskBackend:
+    """
+    One file per key: an 8-byte expiry time followed by the value. Files are
+    renamed into place, and read straight into a buffer of the right size.
+    Reads touch a file's mtime; once writes take the directory over
+    max_bytes (or every DISK_SWEEP_SECONDS), sweep() removes expired files
+    and then the least recently used ones.
+    """
+
+    _HEADER = struct.Struct("<d")
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sweeping = threading.Lock()
+        # Other processes write to the directory too, so this is an estimate each sweep corrects
+        self.size = 0
+        self._last_sweep = 0.0
+        self.sweep()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb", buffering=0) as f:
+                size = os.fstat(f.fileno()).st_size - self._HEADER.size
+                (expires_at,) = self._HEADER.unpack(f.read(self._HEADER.size))
+                if expires_at and expires_at < time.time():
+                    return None
+                value = bytearray(size)
+                f.readinto(value)
+            os.utime(path)
+            return value
+        except (FileNotFoundError, struct.error):
+            return None
+
+    def sweep(self):
+        """Remove expired files, then least recently used ones while over max_bytes; returns the bytes freed."""
+        now = time.time()
+        files, total, freed = [], 0, 0
+        for entry in os.scandir(self.directory):
+            # Skip the temporary files of writes in progress
+            if len(entry.name) != 64:
+                continue
+            try:
+                stat = entry.stat()
+                with open(entry.path, "rb", buffering=0) as f:
+                    (expires_at,) = self._HEADER.unpack(f.read(self._HEADER.size))
+            except (OSError, struct.error):
+                continue
+            if expires_at and expires_at < now:
+                freed += self._remove(entry.path, stat.st_size)
+            else:
+                files.append((stat.st_mtime, entry.path, stat.st_size))
+                total += stat.st_size
+        if self.max_bytes and total > self.max_bytes:
+            # Go a little below the budget so the next few writes don't each start a sweep
+            target = self.max_bytes * 0.9
+            for _, path, size in sorted(files):
+                if total <= target:
+                    break
+                total -= size
+                freed += self._remove(path, size)
+        with self._lock:
+            self.size = total
+            self._last_sweep = now
+        return freed
+
+    @staticmethod
+    def _remove(path, size):
+        try:
+            os.remove(path)
+            return size
+        except FileNotFoundError:
+            return 0
+
+    def _written(self, nbytes):
+        with self._lock:
+            self.size += nbytes
+            due = (self.max_bytes and self.size > self.max_bytes) or time.time() - self._last_sweep > DISK_SWEEP_SECONDS
+        # One sweep at a time; writers that find one running carry on
+        if due and self._sweeping.acquire(blocking=False):
+            try:
+                self.sweep()
+            except OSError as e:
+                print(f"Error sweeping the disk cache: {e}")
+            finally:
+                self._sweeping.release()
+
+    def _write(self, path, value, ttl):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._HEADER.pack(time.time() + ttl if ttl else 0))
+                f.write(value)
+            return tmp_path
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def set(self, key, value, ttl=None):
+        os.replace(self._write(self._path(key), value, ttl), self._path(key))
+        self._written(self._HEADER.size + len(value))
+
+    def add(self, key, value, ttl=None):
+        path = self._path(key)
+        if os.path.exists(path) and self.get(key) is None:
+            # An expired lease left behind by a process that died
+            self.delete(key)
+        tmp_path = self._write(path, value, ttl)
+        try:
+            # link() fails if the key exists, so only one process on the volume wins
+            os.link(tmp_path, path)
+            self._written(self._HEADER.size + len(value))
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class RedisBackend:
+    """
+    Minimal Redis protocol client (GET, SET with PX/NX, DEL), one connection
+    per thread. Values are sent from and received into single buffers, so
+    an audio clip is never copied piece by piece.
+    """
+
+    def __init__(self, host, port, db=0, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+            if self.db:
+                self._command(b"SELECT", str(self.db).encode())
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn:
+            conn[1].close()
+            conn[0].close()
+
+    def _command(self, *args):
+        sock, reader = self._connection()
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            parts += [b"$%d\r\n" % len(arg), arg, b"\r\n"]
+        try:
+            self._send(sock, parts)
+            return self._reply(reader)
+        except OSError:
+            self._close()
+            raise
+
+    @staticmethod
+    def _send(sock, parts):
+        # Gathered writes: the value goes out from its own buffer, not a joined copy
+        views = [memoryview(part).cast("B") for part in parts]
+        while views:
+            sent = sock.sendmsg(views)
+            while views and sent >= len(views[0]):
+                sent -= len(views[0])
+                views.pop(0)
+            if views and sent:
+                views[0] = views[0][sent:]
+
+    def _reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Cache server closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RuntimeError(rest.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            value = bytearray(size)
+            view = memoryview(value)
+            while view:
+                read = reader.readinto(view)
+                if not read:
+                    raise ConnectionError("Cache server closed the connection")
+                view = view[read:]
+            reader.read(2)
+            return value
+        raise RuntimeError(f"Unexpected reply from cache server: {line!r}")
+
+    def get(self, key):
+        return self._command(b"GET", key.encode("utf-8"))
+
+    def set(self, key, value, ttl=None):
+        args = [b"SET", key.encode("utf-8"), value]
+        if ttl:
+            args += [b"PX", str(int(ttl * 1000)).encode()]
+        self._command(*args)
+
+    def add(self, key, value, ttl=None):
+        args = [b"SET", key.encode("utf-8"), value, b"NX"]
+        if ttl:
+            args += [b"PX", str(int(ttl * 1000)).encode()]
+        return self._command(*args) is not None
+
+    def delete(self, key):
+        self._command(b"DEL", key.encode("utf-8"))
+
+
+class Cache:
+    """A backend plus, for networked ones, a small in-process near cache in front of it."""
+
+    def __init__(self, backend, near=None):
+        self.backend = backend
+        self.near = near
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def get(self, key):
+        namespace = _namespace(key)
+        if self.near is not None:
+            value = self.near.get(key)
+            if value is not None:
+                metrics.incr("cache_hits_total", namespace=namespace, tier="near")
+                return value
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            metrics.incr("cache_errors_total", namespace=namespace)
+            print(f"Error reading from the cache: {e}")
+            return None
+        if value is None:
+            metrics.incr("cache_misses_total", namespace=namespace)
+            return None
+        metrics.incr("cache_hits_total", namespace=namespace, tier="shared")
+        if self.near is not None:
+            self.near.set(key, value)
+        return value
+
+    def set(self, key, value, ttl=None):
+        if self.near is not None:
+            self.near.set(key, value, ttl)
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            metrics.incr("cache_errors_total", namespace=_namespace(key))
+            print(f"Error writing to the cache: {e}")
+
+    def _key_lock(self, key):
+        with self._locks_lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = [threading.Lock(), 0]
+            lock[1] += 1
+            return lock
+
+    def _release_key_lock(self, key, lock):
+        with self._locks_lock:
+            lock[1] -= 1
+            if not lock[1]:
+                del self._locks[key]
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """
+        The cached value of key, or compute() stored under it. Nothing is
+        stored when compute() returns None.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        lock = self._key_lock(key)
+        try:
+            with lock[0]:
+                # Another thread of this process may have just computed it
+                value = self._peek(key)
+                if value is not None:
+                    metrics.incr("cache_coalesced_total", namespace=_namespace(key))
+                    return value
+                return self._compute_once(key, compute, ttl)
+        finally:
+            self._release_key_lock(key, lock)
+
+    def _peek(self, key):
+        """Like get(), without counting a hit or miss."""
+        value = self.near.get(key) if self.near is not None else None
+        if value is None:
+            try:
+                value = self.backend.get(key)
+            except Exception:
+                return None
+        return value
+
+    def _compute_once(self, key, compute, ttl):
+        """Compute under a lease in the backend, or wait for the replica that holds it."""
+        lease = f"lease:{key}"
+        try:
+            leased = self.backend.add(lease, uuid.uuid4().hex.encode(), LEASE_SECONDS)
+        except Exception as e:
+            print(f"Error taking a cache lease: {e}")
+            leased = True
+        if not leased:
+            deadline = time.time() + LEASE_SECONDS
+            while time.time() < deadline:
+                time.sleep(LEASE_POLL_SECONDS)
+                value = self._peek(key)
+                if value is not None:
+                    if self.near is not None:
+                        self.near.set(key, value, ttl)
+                    metrics.incr("cache_coalesced_total", namespace=_namespace(key))
+                    return value
+                try:
+                    if self.backend.get(lease) is None:
+                        break
+                except Exception:
+                    break
+        try:
+            with metrics.span(f"cache.compute.{_namespace(key)}"):
+                value = compute()
+            if value is not None:
+                self.set(key, value, ttl)
+            return value
+        finally:
+            if leased:
+                try:
+                    self.backend.delete(lease)
+                except Exception as e:
+                    print(f"Error releasing a cache lease: {e}")
+
+
+def open_cache(url=None):
+    """Open the cache named by url (default: HEALTHMATE_CACHE, then "memory")."""
+    url = url or os.getenv("HEALTHMATE_CACHE", "memory")
+    if url == "memory":
+        backend = MemoryBackend(MEMORY_CACHE_MB * 1024 * 1024)
+        memory_budget.register("cache", backend)
+        return Cache(backend)
+    if url.startswith("disk:"):
+        return Cache(DiskBackend(url[len("disk:"):], DISK_CACHE_MB * 1024 * 1024 or None))
+    if url.startswith("redis://"):
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        backend = RedisBackend(parsed.hostname or "localhost", parsed.port or 6379, db)
+        near = MemoryBackend(NEAR_CACHE_MB * 1024 * 1024)
+        memory_budget.register("near_cache", near)
+        return Cache(backend, near=near)
+    raise ValueError(f"Unsupported cache: {url}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide cache tier."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = open_cache()
+        return _cache
+
+
+def text_key(namespace, *parts):
+    """A short key for values identified by long text (prompts, passages, replies)."""
+    digest = hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
@@ -0,0 +1,365 @@
+import hashlib
+import json
+import queue
+import secrets
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from healthmate import answer_cache, metrics, rag, voice
+from healthmate.request_context import RequestContext
+from healthmate.session_store import open_store, format_history
+from healthmate.text_to_speech_helper import text_to_speech, cached_speech
+from healthmate.translation import translate_text
+
+# Messages shown per "page" of a chat, and how many recent ones the LLM sees as history
+PAGE_SIZE = 20
+HISTORY_MESSAGES = 20
+
+# The owner token is a cookie, not a URL parameter, so sharing a link doesn't share the chats
+OWNER_COOKIE = "healthmate_owner"
+OWNER_COOKIE_DAYS = 365
+
+@st.cache_resource
+def get_session_store():
+    """One chat store per server process, shared by every session and page."""
+    return open_store()
+
+def answer_query(query, context, prompt_template, chat_history=None, chat_id=None,
+                 personalize=None, history_messages=HISTORY_MESSAGES):
+    """
+    Translate the query to English, run the RAG chain and translate the answer
+    back. chat_id defaults to the active chat; personalize, if given, is called
+    with it and returns the chat's prompt variables hook (see rag.run_rag_chain).
+    A chat's first question is answered from the warmed answers when possible.
+    Returns None if no answer could be produced.
+    """
+    chat_id = chat_id or st.session_state.active_chat_id
+    if chat_history is None:
+        recent_messages = get_session_store().recent(chat_id, history_messages)
+        chat_history = format_history(recent_messages)
+
+    with metrics.span("turn"):
+        # Opening questions may have been answered ahead of time by healthmate.warmup
+        if not chat_history and personalize is None:
+            warmed = answer_cache.lookup(prompt_template, context, query)
+            if warmed:
+                return warmed
+
+        # The query is translated to English for the prompt (and for retrieval, unless the index is multilingual)
+        english_response = rag.run_rag_chain(
+            query, prompt_template, chat_history, context, personalize(chat_id) if personalize else None
+        )
+        if english_response is None:
+            # The page shows an error instead; nothing is stored or sent back as history
+            return None
+
+        if context.needs_translation:
+            final_response = translate_text(english_response, context.language, source_language="en")
+            if final_response is None:
+                # Better an answer in English than none at all
+                final_response = english_response
+        else:
+            final_response = english_response
+    return final_response
+
+def recognize_speech(wav_bytes, language):
+    """Transcribe a recording made in the browser, showing the transcript so far while it runs."""
+    placeholder = st.empty()
+    partials = queue.Queue()
+    try:
+        future = voice.submit([voice.read_wav(wav_bytes)], language, partials.put)
+    except Exception as e:
+        return f"Could not read the audio; {e}"
+    # Streamlit elements can only be updated from this thread, so poll the worker's progress
+    while not future.done() or not partials.empty():
+        try:
+            placeholder.info(f"🎙️ {partials.get(timeout=0.1)}")
+        except queue.Empty:
+            pass
+    placeholder.empty()
+    try:
+        text = future.result()
+    except Exception as e:
+        return f"Could not transcribe the audio; {e}"
+    return text or "Could not understand the audio."
+
+def remember_owner(owner_id):
+    """Store the owner token in a browser cookie so the chats survive reloads and server restarts."""
+    cookie = json.dumps(f"{OWNER_COOKIE}={owner_id}; Max-Age={OWNER_COOKIE_DAYS * 86400}; Path=/; SameSite=Strict")
+    # Components run in an iframe of the app's own origin, so the script can set the page's cookie
+    components.html(
+        f"""<script>
+        window.parent.document.cookie = {cookie} + (window.parent.location.protocol === "https:" ? "; Secure" : "");
+        </script>""",
+        height=0,
+    )
+
+def init_session(scope):
+    """Initialize session state for multiple chats if not already set."""
+    if "owner_id" not in st.session_state:
+        owner_id = st.context.cookies.get(OWNER_COOKIE)
+        if not owner_id:
+            owner_id = secrets.token_urlsafe(32)
+            remember_owner(owner_id)
+        st.session_state.owner_id = owner_id
+    if "sid" in st.query_params:
+        # Links from before the cookie carried the owner id; don't let them keep granting access
+        del st.query_params["sid"]
+    # Each chat page keeps its own chat list; switching pages starts from that page's chats
+    if st.session_state.get("chat_scope") != scope:
+        st.session_state.chat_scope = scope
+        st.session_state.active_chat_id = None
+        st.session_state.history_pages = 1
+    # We'll use a separate key for voice input rather than modifying query_bottom directly.
+    if "voice_input" not in st.session_state:
+        st.session_state.voice_input = ""
+
+def chat_owner():
+    """The store owner for this user's chats on the current page."""
+    return f"{st.session_state.owner_id}:{st.session_state.chat_scope}"
+
+def new_chat():
+    """Create an empty chat for this user and make it the active one."""
+    store = get_session_store()
+    title = f"Chat {len(store.list_chats(chat_owner())) + 1}"
+    st.session_state.active_chat_id = store.create_chat(chat_owner(), title)
+    st.session_state.history_pages = 1
+
+def load_messages(chat_id, pages):
+    """Return the newest pages * PAGE_SIZE messages and whether older ones exist."""
+    limit = PAGE_SIZE * pages
+    messages = get_session_store().recent(chat_id, limit + 1)
+    return messages[-limit:], len(messages) > limit
+
+def render_conversation(messages):
+    """Render a page of chat messages, with audio for the bot replies."""
+    for message in messages:
+        if message.role == "user":
+            user_text = message.content.strip()
+            st.markdown(
+                f"""
+                <div class="message-container user">
+                    <div class="user-message">{user_text}</div>
+                    <div class="icon-container">🤓</div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+        elif message.role == "bot":
+            bot_text = message.content.strip()
+            st.markdown(
+                f"""
+                <div class="message-container bot">
+                    <div class="icon-container">🤖</div>
+                    <div class="bot-message">{bot_text}</div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+            # Audio is synthesized only when asked for, then referenced by URL on every rerun
+            # Messages stored before they carried a language fall back to detection
+            context = RequestContext.for_language(message.lang) if message.lang else None
+            audio = cached_speech(bot_text, context)
+            if audio is None and st.button(f"🔊 Listen", key=f"listen_{message.id}"):
+                with st.spinner("Generating audio..."):
+                    audio = text_to_speech(bot_text, context)
+            if audio:
+                audio_url, content_type = audio
+                st.audio(audio_url, format=content_type)
+            st.markdown("<div style='margin-bottom:20px;'></div>", unsafe_allow_html=True)
+
+def run_chat_page(scope, title, prompt_template, about, personalize=None, history_messages=HISTORY_MESSAGES):
+    """
+    The chat page shared by the Q&A and wellness modules. scope keeps each
+    module's chats apart, title is the banner text, prompt_template the
+    module's system prompt (see rag.run_rag_chain) and about the sidebar
+    description. personalize and history_messages are passed to answer_query.
+    """
+    st.set_page_config(page_title="HealthMate", page_icon=":microscope:")
+    metrics.start_from_env()
+
+    init_session(scope)
+
+    # Inject custom CSS for spacing and styling
+    st.markdown(
+        """
+        <style>
+        audio {
+            width: 300px !important;
+            margin-top: 10px;
+            margin-bottom: 5px;
+        }
+        .custom-title { 
+            font-size: 46px; 
+            text-align: center; 
+            font-weight: bold; 
+            font-family: Open Sans; 
+            background: -webkit-linear-gradient(rgb(188, 12, 241), rgb(212, 4, 4)); 
+            -webkit-background-clip: text; 
+            -webkit-text-fill-color: transparent; 
+        }
+        .title-container {
+            text-align: center;
+        }
+        .span { 
+            font-size: 62px; 
+        }
+        .message-container {
+            display: flex;
+            margin: 10px 0;
+            align-items: flex-start;
+        }
+        .message-container.bot {
+            justify-content: flex-start;
+        }
+        .message-container.user {
+            justify-content: flex-end;
+        }
+        .icon-container {
+            font-size: 42px;
+            line-height: 1;
+            margin: 0 8px;
+        }
+        .user-message {
+            background-color: #b5e550 !important;
+            color: black !important;
+            padding: 10px;
+            border-radius: 10px;
+            text-align: right;
+            width: fit-content;
+            max-width: 70%;
+        }
+        .bot-message {
+            background-color: #b3cde0 !important;
+            color: black !important;
+            padding: 10px;
+            border-radius: 10px;
+            text-align: left;
+            width: fit-content;
+            max-width: 70%;
+        }
+        </style>
+        """,
+        unsafe_allow_html=True
+    )
+
+    # Title banner
+    st.markdown(
+        f"""
+        <div class="title-container">
+            <p class='span'><span class='custom-title'>{title}</span></p>
+        </div>
+        """, 
+        unsafe_allow_html=True
+    )
+    
+    # Sidebar Section
+    with st.sidebar:
+        if st.button("Open New Chat"):
+            new_chat()
+
+        chats = get_session_store().list_chats(chat_owner())
+        if chats:
+            chat_ids = [chat.chat_id for chat in chats]
+            chat_titles = {chat.chat_id: chat.title for chat in chats}
+            selected_chat = st.radio(
+                "Previous Chat History", 
+                chat_ids, 
+                format_func=chat_titles.get,
+                index=chat_ids.index(st.session_state.active_chat_id) if st.session_state.active_chat_id in chat_ids else 0
+            )
+            if selected_chat != st.session_state.active_chat_id:
+                st.session_state.history_pages = 1
+            st.session_state.active_chat_id = selected_chat
+        else:
+            # Every chat of this user was evicted from the memory store
+            st.session_state.active_chat_id = None
+
+        # Language selection
+        languages = {
+            "en": "English",
+            "te": "తెలుగు",
+            "ta": "தமிழ்",
+            "kn": "ಕನ್ನಡ",
+            "ml": "മലയാളം",
+            "mr": "मराठी",
+            "es": "Español",
+            "fr": "Français",
+            "de": "Deutsch",
+            "hi": "हिन्दी",
+            "zh": "中文"
+        }
+        language_names = list(languages.values())
+        selected_language_name = st.selectbox("Select your language", language_names, index=0)
+        user_lang = [code for code, name in languages.items() if name == selected_language_name][0]
+        context = RequestContext.for_language(user_lang)
+
+        st.title("About HealthMate")
+        st.info(about)
+        
+        st.title("⚠️Disclaimer")
+        st.warning(
+            "Please note: The information provided here is for general informational purposes only and "
+            "should not be taken as final advice. Always consult with a qualified healthcare provider for "
+            "any recommendations related to medication or treatment."
+        )
+        
+        
+    if not st.session_state.active_chat_id:
+        new_chat()
+    
+    # Display the most recent page of the active chat; older messages load on demand
+    messages, has_older = load_messages(st.session_state.active_chat_id, st.session_state.history_pages)
+    if has_older and st.button("⬆️ Load older messages"):
+        st.session_state.history_pages += 1
+        st.rerun()
+    with metrics.span("render"):
+        render_conversation(messages)
+
+    # Voice input is recorded in the browser; each new recording is transcribed once
+    recording = st.audio_input("🎤 Voice Input")
+    if recording is not None:
+        wav_bytes = recording.getvalue()
+        digest = hashlib.sha1(wav_bytes).hexdigest()
+        if st.session_state.get("voice_digest") != digest:
+            st.session_state.voice_digest = digest
+            spoken_text = recognize_speech(wav_bytes, context.language)
+            # Store recognized text in a separate key
+            st.session_state.voice_input = spoken_text
+
+    # Chat Form
+    with st.form("chat_form", clear_on_submit=True):
+        # Prepopulate with voice_input if available; otherwise, leave it empty.
+        default_value = st.session_state.get("voice_input", "")
+        query = st.text_input("Type your question here...", key="query_bottom", value=default_value)
+        submitted = st.form_submit_button("Ask HealthMate")
+
+        if submitted:
+            if not query.strip():
+                st.warning("Please enter a valid question.")
+            else:
+                with st.spinner("Thinking..."):
+                    final_response = answer_query(
+                        query, context, prompt_template,
+                        personalize=personalize, history_messages=history_messages
+                    )
+                
+                if not final_response:
+                    st.error("Could not get an answer; please try again.")
+                else:
+                    # Store the question only together with its answer
+                    store = get_session_store()
+                    try:
+                        store.append(st.session_state.active_chat_id, "user", query, context.language)
+                    except KeyError:
+                        # The memory store dropped this chat while it sat idle; keep the turn in a new one
+                        new_chat()
+                        store.append(st.session_state.active_chat_id, "user", query, context.language)
+                    store.append(st.session_state.active_chat_id, "bot", final_response, context.language)
+
+                # Remove the voice input so that text input starts empty next time.
+                if "voice_input" in st.session_state:
+                    del st.session_state["voice_input"]
+                
+                # No need to modify query_bottom here; clear_on_submit will reset it.
@@ -0,0 +1,263 @@
+"""
+Write a compacted copy of a pharma_db index. The notebook's chunks overlap
+by half, so every token is stored and embedded about twice, and the papers'
+running headers and footers are embedded on every page. Compaction:
+
+    1. rebuilds each page's text (from the PDFs, or by stitching the
+       overlapping chunks of an existing index back together),
+    2. strips word runs repeated at the top or bottom of most pages of a paper,
+    3. re-splits the pages with a smaller overlap,
+    4. drops chunks that are near-duplicates of one already kept (MinHash
+       over word shingles, bucketed with LSH),
+
+then embeds what is left into a new index and checks that searching it
+still finds what searching the original found.
+
+    python -m healthmate.compaction --from-index pharma_db --output pharma_db_compact
+    python -m healthmate.compaction --from-pdfs research-papers --compare-with pharma_db
+
+Point HEALTHMATE_PHARMA_DB at the output once the recall check passes.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain_core.documents import Document
+
+from healthmate import indexing, rag
+from healthmate.warmup import SEED_QUESTIONS, load_seed
+
+CHUNK_OVERLAP = 10
+# A run of words is boilerplate if it opens (or closes) at least this share of a paper's pages
+BOILERPLATE_SHARE = 0.5
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_MAX_WORDS = 40
+# Chunks whose estimated shingle Jaccard similarity reaches this are near-duplicates
+DUPLICATE_THRESHOLD = 0.8
+SHINGLE_WORDS = 4
+NUM_PERM = 64
+BANDS = 16
+MIN_CHUNK_WORDS = 5
+# A reference passage counts as found if this share of its shingles is in the compacted results
+COVERED_SHARE = 0.5
+
+_PRIME = (1 << 61) - 1
+
+
+def _normalize(words):
+    """Case and page or volume numbers don't make a different word."""
+    return tuple(re.sub(r"\d+", "0", word.casefold()) for word in words)
+
+
+def _page_key(doc):
+    return doc.metadata.get("source", ""), doc.metadata.get("page", 0)
+
+
+def _stitch(texts):
+    """
+    Join chunks that overlap by some words. The words at either edge of an
+    overlap may be cut mid-token, so only the words inside it have to match.
+    """
+    words = texts[0].split()
+    for text in texts[1:]:
+        following = text.split()
+        for n in range(min(len(words), len(following)), 3, -1):
+            if words[len(words) - n + 1:-1] == following[1:n - 1]:
+                # Keep the first overlapping word from the earlier chunk, the rest from the later one
+                words = words[:len(words) - n + 1] + following[1:]
+                break
+        else:
+            words += following
+    return " ".join(words)
+
+
+def pages_from_chunks(chunks):
+    """Rebuild page documents from the overlapping chunks of an index, in stored order."""
+    by_page = defaultdict(list)
+    for chunk in chunks:
+        by_page[_page_key(chunk)].append(chunk)
+    return [
+        Document(page_content=_stitch([chunk.page_content for chunk in page]), metadata=page[0].metadata)
+        for _, page in sorted(by_page.items())
+    ]
+
+
+def _repeated_run(word_lists, min_count):
+    """The longest normalized leading word run shared by at least min_count of the lists, or ()."""
+    for length in range(BOILERPLATE_MAX_WORDS, 2, -1):
+        counts = Counter(_normalize(words[:length]) for words in word_lists if len(words) >= length)
+        if counts:
+            run, count = counts.most_common(1)[0]
+            if count >= min_count:
+                return run
+    return ()
+
+
+def strip_boilerplate(pages):
+    """Remove running headers and footers; returns (pages, words removed)."""
+    by_source = defaultdict(list)
+    for page in pages:
+        by_source[page.metadata.get("source", "")].append(page)
+    stripped, removed = [], 0
+    for source_pages in by_source.values():
+        word_lists = [page.page_content.split() for page in source_pages]
+        min_count = max(BOILERPLATE_MIN_PAGES, math.ceil(BOILERPLATE_SHARE * len(source_pages)))
+        header = _repeated_run(word_lists, min_count)
+        footer = _repeated_run([words[::-1] for words in word_lists], min_count)[::-1]
+        for page, words in zip(source_pages, word_lists):
+            before = len(words)
+            if header and _normalize(words[:len(header)]) == header:
+                words = words[len(header):]
+            if footer and len(words) >= len(footer) and _normalize(words[len(words) - len(footer):]) == footer:
+                words = words[:len(words) - len(footer)]
+            removed += before - len(words)
+            if words:
+                stripped.append(Document(page_content=" ".join(words), metadata=page.metadata))
+    return stripped, removed
+
+
+def shingles(text):
+    # Unlike headers, passages that differ only in a dose or a year are different passages
+    words = text.casefold().split()
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+class MinHasher:
+    """NUM_PERM-value MinHash signatures from universal hashes of 32-bit shingle hashes."""
+
+    def __init__(self, seed=0):
+        rng = np.random.default_rng(seed)
+        # Below 2**29 so a * hash + b stays inside uint64
+        self.a = rng.integers(1, 1 << 29, NUM_PERM, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 29, NUM_PERM, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles(text)),
+            dtype=np.uint64,
+        )
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0)
+
+
+def drop_near_duplicates(chunks, threshold=DUPLICATE_THRESHOLD):
+    """The chunks that are not near-duplicates of an earlier one, and how many were dropped."""
+    hasher = MinHasher()
+    rows = NUM_PERM // BANDS
+    buckets = defaultdict(list)
+    kept, signatures, dropped = [], [], 0
+    for chunk in chunks:
+        signature = hasher.signature(chunk.page_content)
+        keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+        candidates = {i for key in keys for i in buckets.get(key, ())}
+        if any(np.mean(signatures[i] == signature) >= threshold for i in candidates):
+            dropped += 1
+            continue
+        for key in keys:
+            buckets[key].append(len(kept))
+        kept.append(chunk)
+        signatures.append(signature)
+    return kept, dropped
+
+
+def compact(pages, chunk_size=indexing.CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, threshold=DUPLICATE_THRESHOLD):
+    """The compacted chunks of pages, plus what each step removed."""
+    pages, boilerplate_words = strip_boilerplate(pages)
+    chunks = [
+        chunk for chunk in indexing.split_documents(pages, chunk_size, chunk_overlap)
+        if len(chunk.page_content.split()) >= MIN_CHUNK_WORDS
+    ]
+    chunks, duplicates = drop_near_duplicates(chunks, threshold)
+    return chunks, {"boilerplate_words": boilerplate_words, "duplicate_chunks": duplicates}
+
+
+def _percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        f"p{p}_ms": round(values[min(len(values) - 1, int(len(values) * p / 100))] * 1000, 2)
+        for p in (50, 95)
+    }
+
+
+def recall_check(queries, original, compacted, k):
+    """
+    recall@k of the compacted index against the original's top k, and the
+    search latency of both. Chunk boundaries differ, so a reference passage
+    counts as found when most of its shingles are in the compacted results.
+    """
+    recalls, latency = [], {"original": [], "compacted": []}
+    for query in queries:
+        start = time.perf_counter()
+        reference = original.similarity_search(query, k=k)
+        latency["original"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        found = compacted.similarity_search(query, k=k)
+        latency["compacted"].append(time.perf_counter() - start)
+        if not reference:
+            continue
+        found_shingles = set().union(*(shingles(doc.page_content) for doc in found))
+        covered = 0
+        for doc in reference:
+            passage = shingles(doc.page_content)
+            covered += len(passage & found_shingles) >= COVERED_SHARE * len(passage)
+        recalls.append(covered / len(reference))
+    return {
+        f"recall_at_{k}": round(sum(recalls) / len(recalls), 3) if recalls else None,
+        "latency": {name: _percentiles(values) for name, values in latency.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a deduplicated, compacted copy of a pharma_db index")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-pdfs", metavar="DIR", help="directory of research-paper PDFs")
+    source.add_argument("--from-index", metavar="DIR", help="existing index whose chunks are stitched back into pages")
+    parser.add_argument("--retrieval", choices=sorted(rag.EMBEDDING_MODELS), default="english")
+    parser.add_argument("--output", help="compacted index directory (default: the retrieval mode's directory + _compact)")
+    parser.add_argument("--chunk-size", type=int, default=indexing.CHUNK_SIZE, help="tokens per chunk")
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP, help="tokens shared by neighbouring chunks")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD,
+                        help="estimated Jaccard similarity at which a chunk is a near-duplicate")
+    parser.add_argument("--compare-with", metavar="DIR",
+                        help="index to check recall against (default: --from-index, or the retrieval mode's directory)")
+    parser.add_argument("--queries", metavar="FILE", help=f"check queries, .txt or .json (default: {SEED_QUESTIONS})")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or rag.INDEX_DIRS[args.retrieval] + "_compact")
+    original_dir = os.path.abspath(args.compare_with or args.from_index or rag.INDEX_DIRS[args.retrieval])
+    if output == original_dir:
+        parser.error("the compacted index must not replace the one it is checked against")
+
+    if args.from_pdfs:
+        pages = indexing.load_pdf_pages(args.from_pdfs)
+    else:
+        pages = pages_from_chunks(indexing.load_index_chunks(args.from_index))
+    if not pages:
+        raise SystemExit("No pages found to compact.")
+    chunks, removed = compact(pages, args.chunk_size, args.overlap, args.threshold)
+    if not chunks:
+        raise SystemExit("Nothing left to index after compaction.")
+    compacted = indexing.build_index(chunks, args.retrieval, output)
+
+    report = {"pages": len(pages), "chunks": len(chunks), **removed, "index_bytes": indexing.index_size(output)}
+    if os.path.exists(original_dir):
+        original = indexing.open_index(original_dir, args.retrieval)
+        report["original_chunks"] = len(original.get(include=[])["ids"])
+        report["original_index_bytes"] = indexing.index_size(original_dir)
+        queries = [question for question, _ in load_seed(args.queries or SEED_QUESTIONS)]
+        report.update(recall_check(queries, original, compacted, args.k))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Build a pharma_db index for one of the retrieval modes in rag.py, either
+from the research-paper PDFs (as in the module 1 notebook) or by
+re-embedding the chunks of an existing index.
+
+    python -m healthmate.indexing --from-pdfs research-papers --retrieval english
+    python -m healthmate.indexing --from-index pharma_db --retrieval multilingual
+"""
+import argparse
+import os
+import shutil
+
+from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+
+from healthmate import rag
+
+SPLITTER_MODEL = "sentence-transformers/all-mpnet-base-v2"
+CHUNK_SIZE = 100
+CHUNK_OVERLAP = 50
+BATCH_SIZE = 256
+
+
+def load_pdf_pages(directory):
+    """One document per page of every PDF in a directory."""
+    loader = DirectoryLoader(path=directory, glob="*.pdf", show_progress=True, loader_cls=PyPDFLoader)
+    return loader.load()
+
+
+def split_documents(documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Split documents into token-sized chunks that keep their metadata."""
+    from langchain_text_splitters.sentence_transformers import SentenceTransformersTokenTextSplitter
+
+    splitter = SentenceTransformersTokenTextSplitter(
+        model_name=SPLITTER_MODEL,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    return splitter.create_documents(
+        [doc.page_content for doc in documents],
+        [doc.metadata for doc in documents]
+    )
+
+
+def load_pdf_chunks(directory, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Load every PDF in a directory and split it into token-sized chunks."""
+    return split_documents(load_pdf_pages(directory), chunk_size, chunk_overlap)
+
+
+def load_index_chunks(directory):
+    """The chunks stored in an existing index, without their embeddings."""
+    db = Chroma(collection_name=rag.COLLECTION_NAME, persist_directory=directory)
+    stored = db.get(include=["documents", "metadatas"])
+    return [
+        Document(page_content=text, metadata=metadata or {})
+        for text, metadata in zip(stored["documents"], stored["metadatas"])
+    ]
+
+
+def open_index(directory, retrieval, collection_metadata=None):
+    """
+    The index at directory, searched with the retrieval mode's model.
+    collection_metadata (e.g. {"hnsw:M": 32}) only applies when the index is created.
+    """
+    return Chroma(
+        collection_name=rag.COLLECTION_NAME,
+        embedding_function=HuggingFaceEmbeddings(model_name=rag.EMBEDDING_MODELS[retrieval]),
+        persist_directory=directory,
+        collection_metadata=collection_metadata
+    )
+
+
+def index_size(directory):
+    """Bytes the index takes on disk."""
+    return sum(
+        os.path.getsize(os.path.join(folder, name))
+        for folder, _, names in os.walk(directory)
+        for name in names
+    )
+
+
+def build_index(documents, retrieval, output, collection_metadata=None):
+    """Embed documents with the retrieval mode's model into a fresh index at output."""
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    db = open_index(output, retrieval, collection_metadata)
+    for start in range(0, len(documents), BATCH_SIZE):
+        db.add_documents(documents[start:start + BATCH_SIZE])
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a pharma_db index")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-pdfs", metavar="DIR", help="directory of research-paper PDFs")
+    source.add_argument("--from-index", metavar="DIR", help="existing index whose chunks are re-embedded")
+    parser.add_argument("--retrieval", choices=sorted(rag.EMBEDDING_MODELS), default="english")
+    parser.add_argument("--output", help="index directory (default: the retrieval mode's directory)")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or rag.INDEX_DIRS[args.retrieval])
+    if args.from_index and os.path.abspath(args.from_index) == output:
+        parser.error("--from-index and --output must be different directories")
+
+    documents = load_pdf_chunks(args.from_pdfs) if args.from_pdfs else load_index_chunks(args.from_index)
+    if not documents:
+        raise SystemExit("No chunks found to index.")
+    build_index(documents, args.retrieval, output)
+    print(f"Indexed {len(documents)} chunks with {rag.EMBEDDING_MODELS[args.retrieval]} into {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from healthmate import metrics
+
+CONTENT_TYPES = {"mp3": "audio/mpeg", "ogg": "audio/ogg"}
+
+_FILE_NAME = re.compile(r"^/media/([0-9a-f]{64})\.(mp3|ogg)$")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def content_key(*parts):
+    """Address of a clip: sha256 of everything that determines its bytes."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class MediaStore:
+    """
+    Write-once audio clips on disk, addressed by content_key(). Clips are
+    served by URL with long-lived cache headers, so a rerun only sends the
+    browser a URL instead of the audio bytes.
+    """
+
+    def __init__(self, directory, base_url=None, codec="mp3"):
+        self.directory = directory
+        self.base_url = base_url
+        self.codec = codec if codec == "ogg" and shutil.which("ffmpeg") else "mp3"
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key, ext):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def url(self, key, ext):
+        """URL for the clip, or its file path if no media server is running."""
+        if self.base_url:
+            return f"{self.base_url}/media/{key}.{ext}"
+        return self.path(key, ext)
+
+    def lookup(self, key):
+        """Return (url, content_type) of a stored clip, or None."""
+        for ext in (self.codec, "mp3"):
+            if os.path.exists(self.path(key, ext)):
+                metrics.incr("media_cache_hits_total")
+                return self.url(key, ext), CONTENT_TYPES[ext]
+        metrics.incr("media_cache_misses_total")
+        return None
+
+    def put(self, key, write_mp3):
+        """
+        Store a clip produced by write_mp3(path) under key and return
+        (url, content_type). The file is renamed into place, so readers never
+        see a partial clip.
+        """
+        fd, tmp_path = tempfile.mkstemp(suffix=".mp3", dir=self.directory)
+        os.close(fd)
+        try:
+            write_mp3(tmp_path)
+            ext = "mp3"
+            if self.codec == "ogg":
+                ext = self._transcode(tmp_path, key) or "mp3"
+            if ext == "mp3":
+                os.replace(tmp_path, self.path(key, "mp3"))
+            metrics.incr("media_bytes_total", os.path.getsize(self.path(key, ext)), codec=ext)
+            return self.url(key, ext), CONTENT_TYPES[ext]
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _transcode(self, mp3_path, key):
+        """Re-encode to low-bitrate Opus (speech stays clear at ~24 kbit/s)."""
+        ogg_tmp = f"{mp3_path}.ogg"
+        try:
+            with metrics.span("media.transcode"):
+                subprocess.run(
+                    ["ffmpeg", "-y", "-loglevel", "error", "-i", mp3_path,
+                     "-c:a", "libopus", "-b:a", "24k", "-ac", "1", ogg_tmp],
+                    check=True, timeout=60,
+                )
+            os.replace(ogg_tmp, self.path(key, "ogg"))
+            return "ogg"
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Error transcoding audio: {e}")
+            if os.path.exists(ogg_tmp):
+                os.remove(ogg_tmp)
+            return None
+
+
+def byte_range(header, size):
+    """
+    (start, end) of a Range header for a file of size bytes, or None without
+    one. ValueError if the range is malformed or starts past the end.
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(f"Unsupported range: {header}")
+    if match.group(1):
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+        if start >= size or start > end:
+            raise ValueError(f"Range not satisfiable: {header}")
+        return start, end
+    suffix = int(match.group(2))
+    if not suffix or not size:
+        raise ValueError(f"Range not satisfiable: {header}")
+    return max(size - suffix, 0), size - 1
+
+
+def _make_handler(directory):
+    class MediaHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = _FILE_NAME.match(self.path.split("?")[0])
+            file_path = match and os.path.join(directory, f"{match.group(1)}.{match.group(2)}")
+            if not match or not os.path.exists(file_path):
+                self.send_error(404)
+                return
+            etag = f'"{match.group(1)}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            with open(file_path, "rb") as f:
+                data = f.read()
+            try:
+                requested = byte_range(self.headers.get("Range"), len(data))
+            except ValueError:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = requested or (0, len(data) - 1)
+            if requested:
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPES[match.group(2)])
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            # The URL is the content hash, so the clip can be cached forever
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+            self.send_header("ETag", etag)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(data[start:end + 1])
+
+        def log_message(self, format, *args):
+            pass
+
+    return MediaHandler
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_media_store():
+    """
+    The process-wide media store. Configured by HEALTHMATE_MEDIA_DIR,
+    HEALTHMATE_MEDIA_BASE_URL, HEALTHMATE_MEDIA_PORT, HEALTHMATE_MEDIA_HOST
+    and HEALTHMATE_AUDIO_CODEC ("ogg" transcodes to Opus when ffmpeg is installed).
+
+    Without a base URL, clips are handed to Streamlit as file paths and
+    reach the browser through the app itself. With one, clips are linked
+    by URL and served from HEALTHMATE_MEDIA_HOST (127.0.0.1 unless set) on
+    HEALTHMATE_MEDIA_PORT (8502; 0 if another web server serves the directory).
+    """
+    global _store
+    with _store_lock:
+        if _store is not None:
+            return _store
+        directory = os.path.abspath(os.getenv("HEALTHMATE_MEDIA_DIR", "media_cache"))
+        os.makedirs(directory, exist_ok=True)
+        # Only the operator knows the address browsers reach this host by; it isn't the bind address
+        base_url = os.getenv("HEALTHMATE_MEDIA_BASE_URL", "").rstrip("/") or None
+        port = int(os.getenv("HEALTHMATE_MEDIA_PORT", "8502"))
+        if base_url and port:
+            host = os.getenv("HEALTHMATE_MEDIA_HOST", "127.0.0.1")
+            try:
+                server = ThreadingHTTPServer((host, port), _make_handler(directory))
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+            except OSError as e:
+                print(f"Error starting media server, falling back to file paths: {e}")
+                base_url = None
+        _store = MediaStore(directory, base_url, os.getenv("HEALTHMATE_AUDIO_CODEC", "mp3"))
+        return _store
@@ -0,0 +1,109 @@
+"""
+Memory budget for what a long-running server keeps in its own heap: the
+in-process cache tier, chats held by the memory session store and loaded
+speech models. Each registers itself as a pool; a background thread checks
+them every HEALTHMATE_MEMORY_CHECK_SECONDS (10):
+
+    * entries unused for HEALTHMATE_MEMORY_IDLE_MINUTES (30) are dropped,
+    * while the pools together exceed HEALTHMATE_MEMORY_BUDGET_MB (256), the
+      least recently used entries go, cheapest to rebuild first (caches,
+      then models, then chats).
+
+A pool has a size in bytes, evict(nbytes) that drops least recently used
+entries and returns the bytes freed, and optionally evict_idle(seconds).
+Pool sizes, the budget and the process RSS are exported as gauges.
+"""
+import ctypes
+import ctypes.util
+import os
+import threading
+import time
+
+from healthmate import metrics
+
+BUDGET_MB = int(os.getenv("HEALTHMATE_MEMORY_BUDGET_MB", "256"))
+IDLE_SECONDS = int(os.getenv("HEALTHMATE_MEMORY_IDLE_MINUTES", "30")) * 60
+CHECK_SECONDS = float(os.getenv("HEALTHMATE_MEMORY_CHECK_SECONDS", "10"))
+
+# Eviction order under pressure: lower goes first
+CACHE, MODELS, SESSIONS = 0, 1, 2
+
+_lock = threading.Lock()
+_pools = {}
+_thread = None
+
+
+def register(name, pool, priority=CACHE):
+    """Account for pool under name (replacing any pool registered with it) and start the checks."""
+    global _thread
+    with _lock:
+        _pools[name] = (priority, pool)
+        if _thread is None and CHECK_SECONDS > 0:
+            _thread = threading.Thread(target=_run, name="healthmate-memory", daemon=True)
+            _thread.start()
+
+
+def usage():
+    """Bytes held by each registered pool."""
+    with _lock:
+        pools = dict(_pools)
+    return {name: pool.size for name, (_, pool) in pools.items()}
+
+
+def resident_bytes():
+    """Current resident set size of the process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _release_to_os():
+    # glibc keeps freed arenas mapped; give them back so RSS follows what was evicted
+    try:
+        ctypes.CDLL(ctypes.util.find_library("c")).malloc_trim(0)
+    except (OSError, AttributeError, TypeError):
+        pass
+
+
+def enforce(budget_bytes=None, idle_seconds=IDLE_SECONDS):
+    """Drop idle entries, then evict until the pools fit the budget; returns the bytes freed."""
+    budget_bytes = BUDGET_MB * 1024 * 1024 if budget_bytes is None else budget_bytes
+    with _lock:
+        pools = sorted(_pools.items(), key=lambda item: item[1][0])
+    freed = 0
+    for name, (_, pool) in pools:
+        evict_idle = getattr(pool, "evict_idle", None)
+        if evict_idle is not None:
+            released = evict_idle(idle_seconds)
+            metrics.incr("memory_evicted_bytes_total", released, pool=name, reason="idle")
+            freed += released
+
+    over = sum(pool.size for _, (_, pool) in pools) - budget_bytes
+    for name, (_, pool) in pools:
+        if over <= 0:
+            break
+        released = pool.evict(min(over, pool.size))
+        metrics.incr("memory_evicted_bytes_total", released, pool=name, reason="budget")
+        over -= released
+        freed += released
+    if freed:
+        _release_to_os()
+
+    for name, (_, pool) in pools:
+        metrics.set_gauge("memory_pool_bytes", pool.size, pool=name)
+    metrics.set_gauge("memory_budget_bytes", budget_bytes)
+    rss = resident_bytes()
+    if rss is not None:
+        metrics.set_gauge("process_resident_bytes", rss)
+    return freed
+
+
+def _run():
+    while True:
+        time.sleep(CHECK_SECONDS)
+        try:
+            enforce()
+        except Exception as e:
+            print(f"Error enforcing the memory budget: {e}")
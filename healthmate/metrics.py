@@ -0,0 +1,252 @@
+import os
+import sys
+import time
+import threading
+import traceback
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets (seconds) shared by every stage histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_local = threading.local()
+_counters = defaultdict(float)
+_histograms = {}
+_recent_traces = deque(maxlen=50)
+_gauges = {}
+_server = None
+_last_file_write = 0.0
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def incr(name, value=1, **labels):
+    """Add value to a counter, e.g. incr("tts_cache_hits_total")."""
+    if not value:
+        return
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def set_gauge(name, value, **labels):
+    """Set a gauge to an absolute value."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, seconds, **labels):
+    """Record one observation in a latency histogram."""
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+
+
+@contextmanager
+def span(stage):
+    """
+    Time a stage of a request. Spans nest: the outermost span of a thread is
+    the root and is kept (with its children) in recent_traces().
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    node = {"stage": stage, "children": [], "seconds": None}
+    if stack:
+        stack[-1]["children"].append(node)
+    is_root = not stack
+    stack.append(node)
+    sampler = _SlowRequestSampler.start() if is_root else None
+    start = time.perf_counter()
+    try:
+        yield node
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        node["seconds"] = elapsed
+        observe("healthmate_stage_seconds", elapsed, stage=stage)
+        if is_root:
+            with _lock:
+                _recent_traces.append(node)
+            if sampler:
+                sampler.stop(stage, elapsed)
+            _maybe_write_file()
+
+
+def recent_traces():
+    """Return the most recent root spans with their nested children."""
+    with _lock:
+        return list(_recent_traces)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def render_prometheus():
+    """Render all counters, gauges and histograms in Prometheus text format."""
+    lines = []
+    with _lock:
+        seen = set()
+        for (name, labels), value in sorted(_counters.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), value in sorted(_gauges.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} gauge")
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), hist in sorted(_histograms.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} histogram")
+                seen.add(name)
+            for bound, count in zip(BUCKETS, hist["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """Return counters and per-stage {count, sum} totals as plain dicts."""
+    with _lock:
+        counters = {}
+        for (name, labels), value in _counters.items():
+            counters[name] = counters.get(name, 0) + value
+        stages = {}
+        for (name, labels), hist in _histograms.items():
+            if name == "healthmate_stage_seconds":
+                stages[dict(labels)["stage"]] = {"count": hist["count"], "sum": hist["sum"]}
+    return {"counters": counters, "stages": stages}
+
+
+def reset():
+    """Clear every metric (used by benchmarks between runs)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+        _recent_traces.clear()
+
+
+def write_metrics_file(path):
+    """Write the current metrics snapshot to path atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+def _maybe_write_file():
+    global _last_file_write
+    path = os.getenv("HEALTHMATE_METRICS_FILE")
+    if not path or time.monotonic() - _last_file_write < 1.0:
+        return
+    _last_file_write = time.monotonic()
+    try:
+        write_metrics_file(path)
+    except OSError as e:
+        print(f"Error writing metrics file: {e}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics on a background thread. Safe to call on every rerun."""
+    global _server
+    if _server is not None:
+        return _server
+    _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+def start_from_env():
+    """Start the metrics endpoint if HEALTHMATE_METRICS_PORT is set."""
+    port = os.getenv("HEALTHMATE_METRICS_PORT")
+    if port and _server is None:
+        try:
+            start_metrics_server(int(port))
+        except OSError as e:
+            print(f"Error starting metrics server: {e}")
+
+
+class _SlowRequestSampler:
+    """
+    Stack sampler for one root span. Enabled with HEALTHMATE_PROFILE_SLOW_MS;
+    if the span ends up slower than that, the collapsed stacks are written to
+    HEALTHMATE_PROFILE_DIR (flamegraph.pl / speedscope compatible).
+    """
+
+    interval = 0.005
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.thread_id = threading.get_ident()
+        self.samples = defaultdict(int)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    @classmethod
+    def start(cls):
+        threshold_ms = os.getenv("HEALTHMATE_PROFILE_SLOW_MS")
+        if not threshold_ms:
+            return None
+        sampler = cls(float(threshold_ms) / 1000)
+        sampler.thread.start()
+        return sampler
+
+    def _run(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = traceback.extract_stack(frame)
+                key = ";".join(f"{f.name} ({os.path.basename(f.filename)}:{f.lineno})" for f in stack)
+                self.samples[key] += 1
+            time.sleep(self.interval)
+
+    def stop(self, stage, elapsed):
+        self.running = False
+        self.thread.join()
+        if elapsed < self.threshold or not self.samples:
+            return
+        incr("healthmate_slow_requests_total", stage=stage)
+        out_dir = os.getenv("HEALTHMATE_PROFILE_DIR", ".")
+        path = os.path.join(out_dir, f"slow_{stage}_{int(time.time() * 1000)}.folded")
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self.samples.items():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"Error writing profile: {e}")
@@ -0,0 +1,188 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import Chroma
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_groq import ChatGroq
+
+from healthmate import ROOT, metrics
+from healthmate.request_context import RequestContext
+from healthmate.translation import translate_text
+
+PHARMA_DB = os.getenv("HEALTHMATE_PHARMA_DB", os.path.join(ROOT, "pharma_db"))
+LLM_MODEL = "llama-3.3-70b-versatile"
+
+# "english" retrieves with the English query; "multilingual" searches an index
+# built with a multilingual embedding model using the user's own words
+RETRIEVAL = os.getenv("HEALTHMATE_RETRIEVAL", "english")
+EMBEDDING_MODELS = {
+    "english": "all-MiniLM-L6-v2",
+    "multilingual": "paraphrase-multilingual-MiniLM-L12-v2",
+}
+INDEX_DIRS = {
+    "english": PHARMA_DB,
+    "multilingual": os.getenv("HEALTHMATE_PHARMA_DB_MULTILINGUAL", os.path.join(ROOT, "pharma_db_multilingual")),
+}
+COLLECTION_NAME = "pharma_database"
+# Passages put in the prompt, and how they are picked: "similarity" (nearest
+# first) or "mmr" (nearest, skipping passages too close to ones already picked).
+# benchmarks/retrieval_sweep.py measures the trade-offs on the real corpus.
+RETRIEVAL_K = int(os.getenv("HEALTHMATE_RETRIEVAL_K", "5"))
+SEARCH_TYPE = os.getenv("HEALTHMATE_RETRIEVAL_SEARCH", "similarity")
+# MMR chooses its k passages from this many nearest candidates per passage
+MMR_FETCH_FACTOR = 4
+
+_db_lock = threading.Lock()
+_llm_lock = threading.Lock()
+_dbs = {}
+_chat_model = None
+
+# Runs the query translation while the multilingual index is searched
+_translate_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="healthmate-translate")
+
+
+def get_vector_store(retrieval=None):
+    """The embedding model and Chroma index of a retrieval mode, loaded once per process on first use."""
+    retrieval = retrieval or RETRIEVAL
+    if retrieval not in EMBEDDING_MODELS:
+        raise ValueError(f"Unknown retrieval mode '{retrieval}', expected one of {sorted(EMBEDDING_MODELS)}")
+    with _db_lock:
+        if retrieval not in _dbs:
+            with metrics.span("rag.load_index"):
+                embedding_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODELS[retrieval])
+                _dbs[retrieval] = Chroma(
+                    collection_name=COLLECTION_NAME,
+                    embedding_function=embedding_model,
+                    persist_directory=INDEX_DIRS[retrieval]
+                )
+        return _dbs[retrieval]
+
+
+def get_chat_model():
+    """One Groq client per process; its HTTP connection pool is reused by every request."""
+    global _chat_model
+    with _llm_lock:
+        if _chat_model is None:
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise ValueError("GROQ API Key is missing! Please add it to the .env file.")
+            _chat_model = ChatGroq(
+                model=LLM_MODEL,
+                api_key=api_key,
+                temperature=1
+            )
+        return _chat_model
+
+
+def format_docs(docs):
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def retrieve_docs(retriever, question):
+    with metrics.span("rag.retrieve"):
+        return retriever.get_relevant_documents(question)
+
+
+def _record_usage(chat_model, message):
+    usage = getattr(message, "usage_metadata", None) or {}
+    metrics.incr("llm_tokens_in_total", usage.get("input_tokens", 0), model=chat_model.model_name)
+    metrics.incr("llm_tokens_out_total", usage.get("output_tokens", 0), model=chat_model.model_name)
+
+
+def invoke_llm(chat_model, prompt_value):
+    """Call the chat model and record its latency and token usage."""
+    with metrics.span("rag.llm"):
+        message = chat_model.invoke(prompt_value)
+    _record_usage(chat_model, message)
+    return message
+
+
+@lru_cache(maxsize=8)
+def _prompt(prompt_template):
+    return ChatPromptTemplate.from_template(prompt_template)
+
+
+def search_kwargs(k=RETRIEVAL_K, search_type=SEARCH_TYPE):
+    if search_type == "mmr":
+        return {"k": k, "fetch_k": k * MMR_FETCH_FACTOR}
+    return {"k": k}
+
+
+def retrieve_context(query, retrieval=None):
+    """The top passages from pharma_db for a query (English unless retrieval is multilingual), as one string."""
+    retriever = get_vector_store(retrieval).as_retriever(search_type=SEARCH_TYPE, search_kwargs=search_kwargs())
+    return format_docs(retrieve_docs(retriever, query))
+
+
+def prepare_query(query, context, retrieval=None):
+    """
+    Return (english_query, passages) for a user's query. The English index
+    has to wait for the translation; the multilingual one is searched with
+    the original query while the translation for the prompt runs alongside.
+    english_query is None if the translation failed.
+    """
+    retrieval = retrieval or RETRIEVAL
+    if not context.needs_translation:
+        return query, retrieve_context(query, retrieval)
+    if retrieval == "multilingual":
+        pending = _translate_pool.submit(translate_text, query, "en", source_language=context.language)
+        passages = retrieve_context(query, retrieval)
+        return pending.result(), passages
+    english_query = translate_text(query, "en", source_language=context.language)
+    if english_query is None:
+        return None, ""
+    return english_query, retrieve_context(english_query, retrieval)
+
+
+def build_prompt(query, prompt_template, context="", chat_history="", **variables):
+    return _prompt(prompt_template).invoke(
+        {"context": context, "question": query, "chat_history": chat_history, **variables}
+    )
+
+
+def generate_answer(query, prompt_template, context="", chat_history="", **variables):
+    """
+    Answer an English query. prompt_template is the module's system prompt
+    with {chat_history} and {question} placeholders; any others it has are
+    filled from variables.
+    """
+    prompt_value = build_prompt(query, prompt_template, context, chat_history, **variables)
+    message = invoke_llm(get_chat_model(), prompt_value)
+    return message.content
+
+
+def stream_answer(query, prompt_template, context="", chat_history="", **variables):
+    """Like generate_answer, but yield the reply in pieces as the model produces them."""
+    chat_model = get_chat_model()
+    message = None
+    with metrics.span("rag.llm"):
+        for chunk in chat_model.stream(build_prompt(query, prompt_template, context, chat_history, **variables)):
+            message = chunk if message is None else message + chunk
+            if chunk.content:
+                yield chunk.content
+    _record_usage(chat_model, message)
+
+
+def complete(prompt_template, **variables):
+    """Fill a prompt that needs no user query or passages and return the model's reply."""
+    message = invoke_llm(get_chat_model(), _prompt(prompt_template).invoke(variables))
+    return message.content
+
+
+def run_rag_chain(query, prompt_template, chat_history="", context=None, personalize=None):
+    """
+    Retrieve passages for a query and answer it in English with the module's
+    prompt. Without a request context the query must already be English.
+    personalize, if given, is called with the English query and returns the
+    prompt's extra variables.
+    """
+    with metrics.span("rag"):
+        english_query, passages = prepare_query(query, context or RequestContext.for_language("en"))
+        if english_query is None:
+            return None
+        variables = personalize(english_query) if personalize else {}
+        response = generate_answer(english_query, prompt_template, passages, chat_history, **variables)
+    return response
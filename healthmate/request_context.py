@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+
+# Language code -> (writing system, gTTS voice)
+LANGUAGES = {
+    "en": ("Latn", "en"),
+    "es": ("Latn", "es"),
+    "fr": ("Latn", "fr"),
+    "de": ("Latn", "de"),
+    "it": ("Latn", "it"),
+    "pt": ("Latn", "pt-br"),  # Brazilian Portuguese voice
+    "hi": ("Deva", "hi"),
+    "mr": ("Deva", "mr"),
+    "te": ("Telu", "te"),
+    "ta": ("Taml", "ta"),
+    "kn": ("Knda", "kn"),
+    "ml": ("Mlym", "ml"),
+    "zh": ("Hani", "zh-cn"),  # Mandarin voice
+}
+
+# Unicode blocks of each writing system, used to keep vowel signs and other
+# combining marks that a plain \w match would strip before speech synthesis
+SCRIPT_RANGES = {
+    "Latn": "À-ÖØ-öø-ÿ",
+    "Deva": "\u0900-\u097F",
+    "Telu": "\u0C00-\u0C7F",
+    "Taml": "\u0B80-\u0BFF",
+    "Knda": "\u0C80-\u0CFF",
+    "Mlym": "\u0D00-\u0D7F",
+    "Hani": "\u3000-\u303F\u4E00-\u9FFF",
+}
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """
+    The user's language choice, carried through translation, RAG and speech
+    so no stage has to detect it again.
+    """
+
+    language: str
+    script: str
+    tts_lang: str
+
+    @classmethod
+    def for_language(cls, language):
+        script, tts_lang = LANGUAGES.get(language, ("Latn", language))
+        return cls(language, script, tts_lang)
+
+    @property
+    def needs_translation(self):
+        """The LLM and the knowledge base work in English."""
+        return self.language != "en"
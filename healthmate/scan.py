@@ -0,0 +1,172 @@
+"""
+Scan analysis shared by the Streamlit page and the HTTP API: the vision
+model (see vision.py), Google Scholar references and translation of the
+report. Several views of one study are analyzed together in a single
+vision call.
+"""
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from scholarly import scholarly
+
+from healthmate import metrics, vision
+from healthmate.prompts import SCAN_PROMPT, STUDY_PROMPT
+from healthmate.translation import translate_text
+
+# Views of a study are sent at most this large; the model tiles bigger images into more tokens
+MAX_VIEW_SIDE = 1024
+# Views whose 64-bit difference hashes differ in at most this many bits are the same frame
+DUPLICATE_BITS = 4
+
+# Runs analyses for pages that show the report while it is being written
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="healthmate-scan")
+
+
+# Function to search Google Scholar
+def search_google_scholar(query, max_results=3):
+    try:
+        search_query = scholarly.search_pubs(query)
+        results = []
+        for _ in range(max_results):
+            try:
+                pub = next(search_query)
+                results.append({
+                    "title": pub.get("bib", {}).get("title", "No title"),
+                    "year": pub.get("bib", {}).get("pub_year", "Unknown Year"),
+                    "url": pub.get("pub_url", "No URL"),
+                })
+            except StopIteration:
+                break
+        return results
+    except Exception as e:
+        print(f"Error fetching Google Scholar results: {e}")
+        return []
+
+
+def record_vision_usage(backend, result):
+    """Count the tokens reported by the vision model, if any."""
+    metrics.incr("llm_tokens_in_total", result.input_tokens, model=backend.model_name)
+    metrics.incr("llm_tokens_out_total", result.output_tokens, model=backend.model_name)
+
+
+def _write_temp_image(image_bytes, suffix=".png"):
+    # A unique temp file per request so concurrent requests don't overwrite each other's image
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
+        f.write(image_bytes)
+    return f.name
+
+
+def _report(prompt, image_paths, context, on_token=None):
+    """
+    One vision call over the images plus one Scholar lookup; returns
+    (report, translated). on_token gets the English findings as they are written.
+    """
+    try:
+        backend = vision.get_backend()
+        with metrics.span("analyze.vision"):
+            response = backend.generate(prompt, image_paths, on_token)
+        record_vision_usage(backend, response)
+    finally:
+        for image_path in image_paths:
+            os.remove(image_path)
+
+    # Add research context
+    with metrics.span("analyze.scholar"):
+        scholar_results = search_google_scholar("radiology diagnostic imaging treatment protocols")
+    research_md = "\n\n### 5. Research Context\n\nRecent research and treatment guidelines:\n"
+    for res in scholar_results:
+        research_md += f"- [{res['title']}]({res['url']}) ({res['year']})\n"
+
+    report = response.content + research_md
+
+    # Translate output if needed
+    if context.needs_translation:
+        with metrics.span("analyze.translate"):
+            translated_text = translate_text(report, context.language, source_language="en")
+        if not translated_text:
+            return report, False
+        report = translated_text
+    return report, True
+
+
+def analyze_image(image_bytes, context, on_token=None):
+    """
+    Analyze one medical image and return (report, translated). The report is
+    in context.language, or in English with translated=False if the
+    translation failed. Errors from the vision model are raised.
+    """
+    with metrics.span("analyze.file_io"):
+        image_path = _write_temp_image(image_bytes)
+    metrics.incr("upload_bytes_total", len(image_bytes))
+    return _report(SCAN_PROMPT, [image_path], context, on_token)
+
+
+def difference_hash(image):
+    """64-bit perceptual hash: which neighbouring pixels get brighter in a 9x8 grayscale thumbnail."""
+    pixels = list(image.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = bits << 1 | (pixels[row * 9 + col] < pixels[row * 9 + col + 1])
+    return bits
+
+
+def prepare_views(images_bytes):
+    """
+    Decode the uploaded views of a study, drop near-identical frames and
+    downscale the rest. Returns (PNG bytes of each kept view, number dropped).
+    """
+    views, hashes = [], []
+    for image_bytes in images_bytes:
+        image = Image.open(io.BytesIO(image_bytes))
+        image.load()
+        image_hash = difference_hash(image)
+        if any(bin(image_hash ^ seen).count("1") <= DUPLICATE_BITS for seen in hashes):
+            continue
+        hashes.append(image_hash)
+        image.thumbnail((MAX_VIEW_SIDE, MAX_VIEW_SIDE))
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        views.append(buffer.getvalue())
+    return views, len(images_bytes) - len(views)
+
+
+def analyze_study(images_bytes, context, on_token=None):
+    """
+    Analyze several views of one study with a single vision call and a single
+    Scholar lookup. Returns (report, translated, stats), where stats counts
+    the uploaded images, the views sent, the duplicates dropped and the
+    backend calls saved compared with analyzing each image on its own.
+    """
+    metrics.incr("upload_bytes_total", sum(len(image_bytes) for image_bytes in images_bytes))
+    with metrics.span("analyze.file_io"):
+        views, duplicates = prepare_views(images_bytes)
+        image_paths = [_write_temp_image(view) for view in views]
+
+    prompt = SCAN_PROMPT if len(views) == 1 else STUDY_PROMPT.format(count=len(views)) + SCAN_PROMPT
+    report, translated = _report(prompt, image_paths, context, on_token)
+
+    # One vision call and one Scholar lookup instead of one of each per image
+    saved = len(images_bytes) - 1
+    metrics.incr("scan_calls_saved_total", saved, backend="vision")
+    metrics.incr("scan_calls_saved_total", saved, backend="scholar")
+    metrics.incr("scan_duplicate_views_total", duplicates)
+    stats = {
+        "images": len(images_bytes),
+        "views": len(views),
+        "duplicates": duplicates,
+        "vision_calls": 1,
+        "scholar_calls": 1,
+        "calls_saved": 2 * saved,
+    }
+    return report, translated, stats
+
+
+def submit(analysis, *args, **kwargs):
+    """Run analyze_image or analyze_study in the background and return its Future."""
+    return _pool.submit(analysis, *args, **kwargs)
@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from healthmate import memory_budget, metrics
+
+Chat = namedtuple("Chat", "chat_id title")
+Message = namedtuple("Message", "id role content lang", defaults=(None,))
+
+ROLE_PREFIXES = {"user": "🧑:", "bot": "🤖 HealthMate:"}
+
+
+def format_history(messages):
+    """Render messages as the "🧑: ..." / "🤖 HealthMate: ..." lines the prompts expect."""
+    return "\n".join(f"{ROLE_PREFIXES[m.role]} {m.content}" for m in messages)
+
+
+class MemorySessionStore:
+    """
+    Keeps chats in process memory. Lost on restart; handy for benchmarks and
+    demos. Registered with memory_budget, which drops chats that sit idle or
+    that are least recently used when the process is over its budget.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chats = {}
+        self._messages = {}
+        self._profiles = {}
+        self._next_id = 1
+        # chat_id -> [owner, bytes held, last used]
+        self._usage = {}
+        self.size = 0
+
+    def _touch(self, chat_id, added=0):
+        usage = self._usage.get(chat_id)
+        if usage is not None:
+            usage[1] += added
+            usage[2] = time.monotonic()
+            self.size += added
+
+    def create_chat(self, owner, title):
+        chat_id = uuid.uuid4().hex
+        with self._lock:
+            self._chats.setdefault(owner, []).append(Chat(chat_id, title))
+            self._messages[chat_id] = []
+            self._usage[chat_id] = [owner, 0, 0.0]
+            self._touch(chat_id, sys.getsizeof(title))
+        return chat_id
+
+    def list_chats(self, owner):
+        with self._lock:
+            return list(self._chats.get(owner, []))
+
+    def append(self, chat_id, role, content, lang=None):
+        """Add a message; KeyError if the chat does not exist (or was evicted)."""
+        with self._lock:
+            if chat_id not in self._usage:
+                # Recreating it here would hold messages no owner lists and the budget doesn't count
+                raise KeyError(f"Unknown chat {chat_id}")
+            message = Message(self._next_id, role, content, lang)
+            self._next_id += 1
+            self._messages[chat_id].append(message)
+            self._touch(chat_id, sys.getsizeof(message) + sys.getsizeof(content))
+        return message.id
+
+    def recent(self, chat_id, limit, before_id=None):
+        with self._lock:
+            self._touch(chat_id)
+            messages = self._messages.get(chat_id, [])
+            if before_id is not None:
+                messages = [m for m in messages if m.id < before_id]
+            return messages[-limit:] if limit else []
+
+    def count(self, chat_id):
+        with self._lock:
+            return len(self._messages.get(chat_id, []))
+
+    def get_profile(self, chat_id):
+        with self._lock:
+            return dict(self._profiles.get(chat_id, {}))
+
+    def save_profile(self, chat_id, profile):
+        with self._lock:
+            self._profiles[chat_id] = dict(profile)
+
+    def user_questions(self, scope):
+        """(content, lang) of every question asked in the scope's chats."""
+        with self._lock:
+            chat_ids = [chat.chat_id for owner, chats in self._chats.items() if owner.endswith(f":{scope}") for chat in chats]
+            return [(m.content, m.lang) for chat_id in chat_ids for m in self._messages.get(chat_id, []) if m.role == "user"]
+
+    def _drop(self, chat_id):
+        owner, held, _ = self._usage.pop(chat_id)
+        chats = [chat for chat in self._chats.get(owner, []) if chat.chat_id != chat_id]
+        if chats:
+            self._chats[owner] = chats
+        else:
+            self._chats.pop(owner, None)
+        self._messages.pop(chat_id, None)
+        self._profiles.pop(chat_id, None)
+        self.size -= held
+        return held
+
+    def evict(self, nbytes):
+        """Drop least recently used chats until nbytes are freed; returns the bytes freed."""
+        freed = 0
+        with self._lock:
+            for chat_id in sorted(self._usage, key=lambda chat_id: self._usage[chat_id][2]):
+                if freed >= nbytes:
+                    break
+                freed += self._drop(chat_id)
+        return freed
+
+    def evict_idle(self, max_idle):
+        """Drop chats nobody has opened for max_idle seconds; returns the bytes freed."""
+        cutoff = time.monotonic() - max_idle
+        with self._lock:
+            return sum(self._drop(chat_id) for chat_id, usage in list(self._usage.items()) if usage[2] < cutoff)
+
+
+class SQLiteSessionStore:
+    """
+    Chats and messages in a SQLite file. Messages are only ever appended, and
+    reads fetch one page from the (chat_id, id) index, so the cost of a rerun
+    does not grow with the length of the conversation.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chats (
+                    chat_id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS chats_by_owner ON chats (owner, created_at);
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    lang TEXT
+                );
+                CREATE INDEX IF NOT EXISTS messages_by_chat ON messages (chat_id, id);
+                CREATE TABLE IF NOT EXISTS profiles (
+                    chat_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                );
+                """
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(messages)")]
+            if "lang" not in columns:
+                # Stores created before messages carried their language
+                conn.execute("ALTER TABLE messages ADD COLUMN lang TEXT")
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between Streamlit's session threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_chat(self, owner, title):
+        chat_id = uuid.uuid4().hex
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO chats (chat_id, owner, title, created_at) VALUES (?, ?, ?, ?)",
+                (chat_id, owner, title, time.time()),
+            )
+        return chat_id
+
+    def list_chats(self, owner):
+        rows = self._connection().execute(
+            "SELECT chat_id, title FROM chats WHERE owner = ? ORDER BY created_at", (owner,)
+        ).fetchall()
+        return [Chat(*row) for row in rows]
+
+    def append(self, chat_id, role, content, lang=None):
+        with metrics.span("session.append"):
+            with self._connection() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO messages (chat_id, role, content, created_at, lang) VALUES (?, ?, ?, ?, ?)",
+                    (chat_id, role, content, time.time(), lang),
+                )
+        return cursor.lastrowid
+
+    def recent(self, chat_id, limit, before_id=None):
+        """Return up to limit messages older than before_id (or the newest ones), oldest first."""
+        with metrics.span("session.load"):
+            if before_id is None:
+                rows = self._connection().execute(
+                    "SELECT id, role, content, lang FROM messages WHERE chat_id = ? ORDER BY id DESC LIMIT ?",
+                    (chat_id, limit),
+                ).fetchall()
+            else:
+                rows = self._connection().execute(
+                    "SELECT id, role, content, lang FROM messages WHERE chat_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                    (chat_id, before_id, limit),
+                ).fetchall()
+        return [Message(*row) for row in reversed(rows)]
+
+    def count(self, chat_id):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM messages WHERE chat_id = ?", (chat_id,)
+        ).fetchone()[0]
+
+    def get_profile(self, chat_id):
+        """The structured user profile kept for a chat, as a dict (empty if none yet)."""
+        row = self._connection().execute(
+            "SELECT data FROM profiles WHERE chat_id = ?", (chat_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def save_profile(self, chat_id, profile):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO profiles (chat_id, data) VALUES (?, ?)",
+                (chat_id, json.dumps(profile)),
+            )
+
+    def user_questions(self, scope):
+        """(content, lang) of every question asked in the scope's chats; the query log of the warm-up job."""
+        return self._connection().execute(
+            "SELECT m.content, m.lang FROM messages m JOIN chats c ON c.chat_id = m.chat_id"
+            " WHERE m.role = 'user' AND c.owner LIKE ?",
+            (f"%:{scope}",),
+        ).fetchall()
+
+
+def open_store(url=None):
+    """
+    Open the store named by url (default: HEALTHMATE_SESSION_STORE, then
+    "sqlite:chat_sessions.db"). Supported: "sqlite:<path>" and "memory".
+    """
+    url = url or os.getenv("HEALTHMATE_SESSION_STORE", "sqlite:chat_sessions.db")
+    if url == "memory":
+        store = MemorySessionStore()
+        memory_budget.register("sessions", store, memory_budget.SESSIONS)
+        return store
+    if url.startswith("sqlite:"):
+        return SQLiteSessionStore(url[len("sqlite:"):])
+    raise ValueError(f"Unsupported session store: {url}")
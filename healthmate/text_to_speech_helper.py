@@ -0,0 +1,88 @@
+import io
+import re
+from gtts import gTTS
+import langdetect  
+
+from healthmate import metrics
+from healthmate.cache import get_cache
+from healthmate.media_store import content_key, get_media_store
+from healthmate.request_context import SCRIPT_RANGES
+
+# Normal speed: slow=True doubles the clip length (and its size) for little gain in clarity
+SLOW_SPEECH = False
+
+def clean_text(text, script=None):
+    """
+    Remove unnecessary special characters but keep non-English scripts.
+    """
+    extra = SCRIPT_RANGES.get(script, "")
+    text = re.sub(rf'[^\w\s.,!?₹€À-ÖØ-öø-ÿ\u0900-\u097F\u0B80-\u0BFF\u0C00-\u0C7F{extra}]', '', text)  
+    return text
+
+def detect_language(text):
+    """Detect language dynamically."""
+    try:
+        return langdetect.detect(text)
+    except:
+        return "en"  # Default to English if detection fails
+
+def speech_key(cleaned_text, tts_lang):
+    return content_key("gtts", SLOW_SPEECH, tts_lang or "auto", cleaned_text)
+
+def cached_speech(response_text, context=None):
+    """
+    Return (url, content_type) of an already synthesized clip for this text,
+    or None. Cheap enough to call for every message on every rerun.
+    """
+    script = context.script if context else None
+    tts_lang = context.tts_lang if context else None
+    return get_media_store().lookup(speech_key(clean_text(response_text, script), tts_lang))
+
+def text_to_speech(response_text, context=None):
+    """
+    Convert cleaned text to speech and return (url, content_type) of the stored clip.
+    The voice comes from the request context; the language is only detected
+    for messages that were stored without one.
+    """
+    try:
+        cleaned_text = clean_text(response_text, context.script if context else None)  
+        key = speech_key(cleaned_text, context.tts_lang if context else None)
+        store = get_media_store()
+        cached = store.lookup(key)
+        if cached:
+            return cached
+
+        if context:
+            lang_code = context.tts_lang
+        else:
+            with metrics.span("tts.detect"):
+                detected_lang = detect_language(cleaned_text)  
+
+            # Handle regional language codes
+            language_map = {
+                "zh": "zh-cn",  # Convert generic Chinese to Mandarin
+                "pt": "pt-br",  # Convert Portuguese to Brazilian Portuguese
+                "te": "te",  # Ensure Telugu is correctly recognized
+            }
+            lang_code = language_map.get(detected_lang, detected_lang)
+
+        def synthesize():
+            with metrics.span("tts.synthesize"):
+                tts = gTTS(text=cleaned_text, lang=lang_code, slow=SLOW_SPEECH)
+                clip = io.BytesIO()
+                tts.write_to_fp(clip)
+            metrics.incr("tts_audio_bytes_total", clip.tell(), lang=lang_code)
+            return clip.getbuffer()
+
+        # A clip synthesized by any replica is fetched from the cache tier instead of synthesized again
+        clip = get_cache().get_or_compute(f"tts:{key}", synthesize)
+
+        def write_mp3(path):
+            with open(path, "wb") as f:
+                f.write(clip)
+
+        return store.put(key, write_mp3)
+    except Exception as e:
+        metrics.incr("tts_errors_total")
+        print(f"Error in Text-to-Speech: {e}")
+        return None
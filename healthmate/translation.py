@@ -0,0 +1,39 @@
+from deep_translator import GoogleTranslator
+
+from healthmate import metrics
+from healthmate.cache import get_cache, text_key
+
+# Part of every key, so clear_cache() can retire old entries even in a shared backend
+_generation = 0
+
+def _translate(text, target_language, source_language):
+    try:
+        with metrics.span("translate"):
+            translated = GoogleTranslator(source=source_language, target=target_language).translate(text)
+        metrics.incr("translate_chars_total", len(text), target=target_language)
+    except Exception as e:
+        metrics.incr("translate_errors_total", target=target_language)
+        print(f"Error during translation: {e}")
+        return None
+    return translated.encode("utf-8") if translated is not None else None
+
+def translate_text(text, target_language, source_language='auto'):
+    # Pass the known source language so the provider doesn't detect it again,
+    # and skip the round-trip entirely when there is nothing to translate
+    if source_language == target_language:
+        metrics.incr("translate_skipped_total", target=target_language)
+        return text
+    # Translations are shared through the cache tier with every page, session and replica;
+    # concurrent requests for the same text wait for one call to the provider
+    computed = []
+    def compute():
+        computed.append(True)
+        return _translate(text, target_language, source_language)
+    translated = get_cache().get_or_compute(text_key("translate", _generation, text, source_language, target_language), compute)
+    metrics.incr("translate_cache_misses_total" if computed else "translate_cache_hits_total")
+    return bytes(translated).decode("utf-8") if translated is not None else None
+
+def clear_cache():
+    """Stop reusing the translations made so far, e.g. to time the provider in an evaluation."""
+    global _generation
+    _generation += 1
@@ -0,0 +1,240 @@
+"""
+Vision model backends for the scan analyzer (HEALTHMATE_VISION_BACKEND):
+
+    gemini  the hosted Gemini model through phi, as before (needs GOOGLE_API_KEY)
+    local   the radiography fine-tune of Llama_3_2_Vision_Finetuning_Unsloth_Radiography.ipynb,
+            exported with model.save_pretrained_merged() to HEALTHMATE_VISION_MODEL_PATH and
+            run on the CPU with int8 dynamic quantization (HEALTHMATE_VISION_QUANTIZE=none to skip)
+
+A backend's generate(prompt, image_paths, on_token) returns a VisionResult
+and, if on_token is given, calls it with each piece of text as it is
+produced. The local backend batches concurrent requests: requests that
+arrive within HEALTHMATE_VISION_BATCH_WAIT_MS of each other, up to
+HEALTHMATE_VISION_MAX_BATCH, share one generate() pass over the model.
+"""
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from PIL import Image
+
+from healthmate import metrics
+
+BACKEND = os.getenv("HEALTHMATE_VISION_BACKEND", "gemini")
+GEMINI_MODEL = "gemini-2.0-flash-exp"
+LOCAL_MODEL_PATH = os.getenv("HEALTHMATE_VISION_MODEL_PATH", "unsloth_finetune")
+LOCAL_QUANTIZE = os.getenv("HEALTHMATE_VISION_QUANTIZE", "int8")
+MAX_BATCH = int(os.getenv("HEALTHMATE_VISION_MAX_BATCH", "4"))
+BATCH_WAIT_MS = int(os.getenv("HEALTHMATE_VISION_BATCH_WAIT_MS", "50"))
+# Sampling settings of the notebook's inference cells
+MAX_NEW_TOKENS = int(os.getenv("HEALTHMATE_VISION_MAX_NEW_TOKENS", "512"))
+TEMPERATURE = 1.5
+MIN_P = 0.1
+
+VisionResult = namedtuple("VisionResult", "content input_tokens output_tokens")
+
+
+class GeminiBackend:
+    """The hosted model; the report arrives in one piece."""
+
+    model_name = GEMINI_MODEL
+
+    def __init__(self):
+        from phi.model.google import Gemini
+
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("Missing API Key. Please add it to your .env file.")
+        # Agents keep per-run memory, so only the model is shared
+        self._model = Gemini(api_key=api_key, id=GEMINI_MODEL)
+
+    def generate(self, prompt, image_paths, on_token=None):
+        from phi.agent import Agent
+
+        medical_agent = Agent(model=self._model, markdown=True)
+        response = medical_agent.run(prompt, images=image_paths)
+        run_metrics = getattr(response, "metrics", None) or {}
+        if on_token:
+            on_token(response.content)
+        return VisionResult(
+            response.content,
+            sum(run_metrics.get("input_tokens", [])),
+            sum(run_metrics.get("output_tokens", [])),
+        )
+
+
+class TransformersVisionModel:
+    """
+    The merged fine-tune loaded with transformers on the CPU. generate() takes
+    a batch of (prompt, images) requests and calls on_piece(row, text) as each
+    row's tokens are decoded.
+    """
+
+    def __init__(self, path, quantize=LOCAL_QUANTIZE):
+        import torch
+        from transformers import AutoProcessor
+        try:
+            from transformers import AutoModelForImageTextToText as AutoModel
+        except ImportError:
+            # Releases before 4.46 only have the older name
+            from transformers import AutoModelForVision2Seq as AutoModel
+
+        self._torch = torch
+        self.processor = AutoProcessor.from_pretrained(path)
+        # Rows of a batch are padded on the left so they all end where generation starts
+        self.processor.tokenizer.padding_side = "left"
+        model = AutoModel.from_pretrained(path, torch_dtype=torch.float32, low_cpu_mem_usage=True)
+        if quantize == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model.eval()
+
+    def generate(self, requests, on_piece):
+        from transformers.generation.streamers import BaseStreamer
+
+        tokenizer = self.processor.tokenizer
+        texts = [
+            self.processor.apply_chat_template(
+                [{"role": "user", "content": [{"type": "image"}] * len(images) + [{"type": "text", "text": prompt}]}],
+                add_generation_prompt=True,
+            )
+            for prompt, images in requests
+        ]
+        inputs = self.processor(
+            images=[images for _, images in requests], text=texts,
+            add_special_tokens=False, padding=True, return_tensors="pt",
+        )
+        stop_ids = {tokenizer.eos_token_id, tokenizer.pad_token_id} - {None}
+        rows = [[] for _ in requests]
+        finished = [False] * len(requests)
+        emitted = [""] * len(requests)
+
+        class BatchStreamer(BaseStreamer):
+            def __init__(self):
+                self.prompt_seen = False
+
+            def put(self, value):
+                # The first call carries the prompts; after that one new token per row
+                if not self.prompt_seen:
+                    self.prompt_seen = True
+                    return
+                for row, token in enumerate(value.reshape(-1).tolist()):
+                    if finished[row]:
+                        continue
+                    if token in stop_ids:
+                        finished[row] = True
+                        continue
+                    rows[row].append(token)
+                    text = tokenizer.decode(rows[row], skip_special_tokens=True)
+                    # Hold back a trailing partial character until the next token completes it
+                    if not text.endswith("�") and len(text) > len(emitted[row]):
+                        on_piece(row, text[len(emitted[row]):])
+                        emitted[row] = text
+
+            def end(self):
+                pass
+
+        with self._torch.inference_mode():
+            self.model.generate(
+                **inputs, streamer=BatchStreamer(), max_new_tokens=MAX_NEW_TOKENS, use_cache=True,
+                do_sample=True, temperature=TEMPERATURE, min_p=MIN_P,
+                pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
+            )
+        prompt_tokens = inputs["attention_mask"].sum(dim=1).tolist()
+        results = []
+        for row, tokens in enumerate(rows):
+            text = tokenizer.decode(tokens, skip_special_tokens=True)
+            # A row that stopped on an incomplete character still owes its held-back tail
+            if len(text) > len(emitted[row]):
+                on_piece(row, text[len(emitted[row]):])
+            results.append(VisionResult(text, prompt_tokens[row], len(tokens)))
+        return results
+
+
+class _Request:
+    def __init__(self, prompt, images, on_token):
+        self.prompt = prompt
+        self.images = images
+        self.on_token = on_token
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class LocalBackend:
+    """Runs a local model in one scheduler thread that batches the requests waiting for it."""
+
+    model_name = "local:" + os.path.basename(os.path.normpath(LOCAL_MODEL_PATH))
+
+    def __init__(self, model=None, max_batch=MAX_BATCH, batch_wait_ms=BATCH_WAIT_MS):
+        self.model = model or TransformersVisionModel(LOCAL_MODEL_PATH)
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait_ms / 1000
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="healthmate-vision", daemon=True).start()
+
+    def generate(self, prompt, image_paths, on_token=None):
+        # Decode now: the caller removes its temp files once this returns
+        images = [Image.open(path).convert("RGB") for path in image_paths]
+        request = _Request(prompt, images, on_token)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            metrics.incr("vision_batches_total")
+            metrics.incr("vision_batched_requests_total", len(batch))
+
+            def on_piece(row, text):
+                if batch[row].on_token:
+                    batch[row].on_token(text)
+
+            try:
+                with metrics.span("vision.local"):
+                    results = self.model.generate([(r.prompt, r.images) for r in batch], on_piece)
+                for request, result in zip(batch, results):
+                    request.result = result
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "local": LocalBackend,
+}
+
+_backend_lock = threading.Lock()
+_backend = None
+
+
+def get_backend():
+    """The configured vision backend, loaded once per process."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown vision backend '{BACKEND}', expected one of {sorted(BACKENDS)}")
+            _backend = BACKENDS[BACKEND]()
+        return _backend
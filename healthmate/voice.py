@@ -0,0 +1,306 @@
+"""
+Voice input: audio recorded in the browser is trimmed of silence and
+transcribed by a local speech engine in a worker pool, reporting the
+transcript so far while it runs.
+
+Engines (HEALTHMATE_ASR_ENGINE):
+    vosk     offline Kaldi models, one folder per language code under HEALTHMATE_VOSK_MODELS
+             (default; falls back to google while no model is installed)
+    whisper  offline faster-whisper model HEALTHMATE_WHISPER_MODEL (default "base"), all languages
+    google   the Google Web Speech API through SpeechRecognition (needs network, as before)
+"""
+import io
+import json
+import os
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from healthmate import ROOT, memory_budget, metrics
+
+ENGINE = os.getenv("HEALTHMATE_ASR_ENGINE", "vosk")
+ASR_WORKERS = int(os.getenv("HEALTHMATE_ASR_WORKERS", str(os.cpu_count() or 2)))
+VOSK_MODELS = os.getenv("HEALTHMATE_VOSK_MODELS", os.path.join(ROOT, "vosk_models"))
+WHISPER_MODEL = os.getenv("HEALTHMATE_WHISPER_MODEL", "base")
+
+# Engines take 16 kHz mono 16-bit PCM, fed in quarter-second chunks
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = SAMPLE_RATE // 4
+
+# Voice activity detection works on 30 ms frames; a frame is speech when it is
+# SPEECH_MARGIN_DB above the tracked noise floor (and above MIN_SPEECH_DBFS),
+# and PAD_FRAMES of silence are kept around speech so words aren't clipped.
+# The floor drops to quieter frames at once and rises towards louder ones by
+# NOISE_RISE of the difference per frame (SPEECH_RISE while they are speech)
+FRAME_SAMPLES = SAMPLE_RATE * 30 // 1000
+MIN_SPEECH_DBFS = -50.0
+SPEECH_MARGIN_DB = 15.0
+PAD_FRAMES = 10
+NOISE_RISE = 0.05
+SPEECH_RISE = 0.003
+
+
+def read_wav(data):
+    """Decode a 16-bit PCM WAV file into 16 kHz mono samples."""
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("Only 16-bit PCM audio is supported.")
+            rate = wav.getframerate()
+            channels = wav.getnchannels()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+    except (wave.Error, EOFError) as e:
+        raise ValueError(f"Not a WAV recording ({str(e) or 'truncated file'}).")
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels]
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return resample(samples, rate)
+
+
+def resample(samples, rate):
+    """Linear resampling to SAMPLE_RATE, which is plenty for speech recognition."""
+    if rate == SAMPLE_RATE or len(samples) == 0:
+        return samples
+    positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+
+class SilenceTrimmer:
+    """
+    Streaming energy-based voice activity detection. feed() takes samples as
+    they arrive and returns the ones worth sending to the engine; flush()
+    returns whatever is still held back.
+    """
+
+    def __init__(self):
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._preroll = deque(maxlen=PAD_FRAMES)
+        self._hangover = 0
+        # No quieter than the speech threshold to start with: the first frames of a room
+        # louder than that aren't speech, and the floor drops to a quieter room at once
+        self._noise_floor = MIN_SPEECH_DBFS
+        self.samples_in = 0
+        self.samples_out = 0
+
+    def _is_speech(self, frame):
+        rms = np.sqrt(np.mean(frame.astype(np.float64) ** 2))
+        level = 20 * np.log10(max(rms, 1.0) / 32768)
+        if level < self._noise_floor:
+            self._noise_floor = level
+        speech = level > max(MIN_SPEECH_DBFS, self._noise_floor + SPEECH_MARGIN_DB)
+        # Rise towards louder frames so a change of room doesn't count as speech for long,
+        # but barely during speech, or a long sentence would become the floor
+        self._noise_floor += (level - self._noise_floor) * (SPEECH_RISE if speech else NOISE_RISE)
+        return speech
+
+    def feed(self, samples):
+        self.samples_in += len(samples)
+        self._pending = np.concatenate([self._pending, samples])
+        kept = []
+        while len(self._pending) >= FRAME_SAMPLES:
+            frame, self._pending = self._pending[:FRAME_SAMPLES], self._pending[FRAME_SAMPLES:]
+            if self._is_speech(frame):
+                kept.extend(self._preroll)
+                self._preroll.clear()
+                kept.append(frame)
+                self._hangover = PAD_FRAMES
+            elif self._hangover > 0:
+                kept.append(frame)
+                self._hangover -= 1
+            else:
+                self._preroll.append(frame)
+        voiced = np.concatenate(kept) if kept else np.zeros(0, dtype=np.int16)
+        self.samples_out += len(voiced)
+        return voiced
+
+    def flush(self):
+        tail = self._pending if self._hangover > 0 else np.zeros(0, dtype=np.int16)
+        self._pending = np.zeros(0, dtype=np.int16)
+        self.samples_out += len(tail)
+        return tail
+
+
+def trim_silence(samples):
+    trimmer = SilenceTrimmer()
+    return np.concatenate([trimmer.feed(samples), trimmer.flush()])
+
+
+def pcm_chunks(samples):
+    """Split 16 kHz samples into the PCM byte chunks the engines consume."""
+    for start in range(0, len(samples), CHUNK_SAMPLES):
+        yield samples[start:start + CHUNK_SAMPLES].astype("<i2").tobytes()
+
+
+class VoskEngine:
+    """Offline streaming recognition with Kaldi models; partial results come for free."""
+
+    def __init__(self):
+        import vosk
+
+        self._vosk = vosk
+        # language -> [model, bytes on disk, last used]
+        self._models = {}
+        self._lock = threading.Lock()
+        self.size = 0
+        memory_budget.register("asr_models", self, memory_budget.MODELS)
+
+    def _model(self, language):
+        with self._lock:
+            if language not in self._models:
+                path = os.path.join(VOSK_MODELS, language)
+                if not os.path.isdir(path):
+                    raise ValueError(f"No Vosk model for '{language}' in {VOSK_MODELS}.")
+                # The model files are loaded whole, so their size is what the model takes in memory
+                held = sum(
+                    os.path.getsize(os.path.join(folder, name))
+                    for folder, _, names in os.walk(path)
+                    for name in names
+                )
+                self._models[language] = [self._vosk.Model(path), held, 0.0]
+                self.size += held
+            entry = self._models[language]
+            entry[2] = time.monotonic()
+            return entry[0]
+
+    def _unload(self, languages):
+        # Recognizers already running keep their model until they finish
+        freed = sum(self._models.pop(language)[1] for language in languages)
+        self.size -= freed
+        return freed
+
+    def evict(self, nbytes):
+        """Unload least recently used models until nbytes are freed; returns the bytes freed."""
+        with self._lock:
+            languages, freed = [], 0
+            for language in sorted(self._models, key=lambda language: self._models[language][2]):
+                if freed >= nbytes:
+                    break
+                languages.append(language)
+                freed += self._models[language][1]
+            return self._unload(languages)
+
+    def evict_idle(self, max_idle):
+        """Unload models nobody has used for max_idle seconds; returns the bytes freed."""
+        cutoff = time.monotonic() - max_idle
+        with self._lock:
+            return self._unload([language for language, entry in self._models.items() if entry[2] < cutoff])
+
+    def stream(self, chunks, language):
+        recognizer = self._vosk.KaldiRecognizer(self._model(language), SAMPLE_RATE)
+        segments = []
+        for chunk in chunks:
+            if recognizer.AcceptWaveform(chunk):
+                segments.append(json.loads(recognizer.Result()).get("text", ""))
+                yield " ".join(filter(None, segments))
+            else:
+                partial = json.loads(recognizer.PartialResult()).get("partial", "")
+                yield " ".join(filter(None, segments + [partial]))
+        segments.append(json.loads(recognizer.FinalResult()).get("text", ""))
+        yield " ".join(filter(None, segments))
+
+
+class WhisperEngine:
+    """Offline multilingual recognition; segments are reported as they are decoded."""
+
+    def __init__(self):
+        from faster_whisper import WhisperModel
+
+        self._model = WhisperModel(WHISPER_MODEL, device="cpu", compute_type="int8")
+
+    def stream(self, chunks, language):
+        audio = np.frombuffer(b"".join(chunks), dtype="<i2").astype(np.float32) / 32768
+        segments, _ = self._model.transcribe(audio, language=language)
+        text = ""
+        for segment in segments:
+            text = f"{text} {segment.text.strip()}".strip()
+            yield text
+        yield text
+
+
+class GoogleEngine:
+    """The previous behaviour: one request to the Google Web Speech API per recording."""
+
+    def __init__(self):
+        import speech_recognition as sr
+
+        self._sr = sr
+
+    def stream(self, chunks, language):
+        audio = self._sr.AudioData(b"".join(chunks), SAMPLE_RATE, 2)
+        try:
+            yield self._sr.Recognizer().recognize_google(audio, language=language)
+        except self._sr.UnknownValueError:
+            yield ""
+
+
+ENGINES = {
+    "vosk": VoskEngine,
+    "whisper": WhisperEngine,
+    "google": GoogleEngine,
+}
+
+_engine_lock = threading.Lock()
+_engine = None
+_pool = ThreadPoolExecutor(ASR_WORKERS, thread_name_prefix="healthmate-asr")
+
+
+def vosk_models_installed():
+    """Whether there is at least one model folder under VOSK_MODELS."""
+    return os.path.isdir(VOSK_MODELS) and any(entry.is_dir() for entry in os.scandir(VOSK_MODELS))
+
+
+def get_engine():
+    """The configured speech engine, loaded once per process."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if ENGINE not in ENGINES:
+                raise ValueError(f"Unknown speech engine '{ENGINE}', expected one of {sorted(ENGINES)}")
+            if ENGINE != "vosk":
+                _engine = ENGINES[ENGINE]()
+                return _engine
+            reason = None if vosk_models_installed() else f"no Vosk models in {VOSK_MODELS}"
+            if reason is None:
+                try:
+                    _engine = ENGINES["vosk"]()
+                except ImportError:
+                    reason = "the vosk package is not installed"
+            if reason:
+                print(f"Speech recognition falls back to the Google Web Speech API, which sends the audio "
+                      f"to Google: {reason}. See the README to install Vosk.")
+                _engine = ENGINES["google"]()
+        return _engine
+
+
+def transcribe(samples, language, on_partial=None):
+    """
+    Trim the silence from an iterable of 16 kHz sample arrays, transcribe
+    what is left and return the final text. on_partial is called with the
+    transcript so far whenever it changes.
+    """
+    trimmer = SilenceTrimmer()
+
+    def voiced_chunks():
+        for block in samples:
+            yield from pcm_chunks(trimmer.feed(block))
+        yield from pcm_chunks(trimmer.flush())
+
+    text = ""
+    with metrics.span("voice.asr"):
+        for transcript in get_engine().stream(voiced_chunks(), language):
+            if transcript != text:
+                text = transcript
+                if on_partial:
+                    on_partial(text)
+    metrics.incr("voice_audio_seconds_total", trimmer.samples_in / SAMPLE_RATE, stage="recorded")
+    metrics.incr("voice_audio_seconds_total", trimmer.samples_out / SAMPLE_RATE, stage="recognized")
+    return text
+
+
+def submit(samples, language, on_partial=None):
+    """Run transcribe() in the recognition pool and return its Future."""
+    return _pool.submit(transcribe, samples, language, on_partial)
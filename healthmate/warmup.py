@@ -0,0 +1,154 @@
+"""
+Answer the most asked Q&A questions ahead of time, in every language, so
+the first user to ask one after a deploy is served from the answer cache
+(see answer_cache.py) and the "Listen" clip is already in the media store.
+
+Questions come from the chat store's query log, or from a seed list (one
+English question per line, or a JSON list of strings). Run it after
+changing the prompt, the model or the index; answers of older versions are
+no longer served and --prune removes them.
+
+    python -m healthmate.warmup --top 50
+    python -m healthmate.warmup --from-store sqlite:chat_sessions.db --top 100 --langs en,hi,te --prune
+"""
+import argparse
+import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from healthmate import answer_cache, prompts, rag
+from healthmate.answer_cache import AnswerCache, cache_version, normalize
+from healthmate.request_context import LANGUAGES, RequestContext
+from healthmate.session_store import open_store
+from healthmate.translation import translate_text
+
+SEED_QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_seed.txt")
+PROMPT_TEMPLATE = prompts.QA_PROMPT
+
+
+def load_seed(path):
+    """English seed questions, most important first."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    questions = json.loads(text) if path.endswith(".json") else text.splitlines()
+    return [(question.strip(), "en") for question in questions if question.strip()]
+
+
+def top_questions(store, limit):
+    """The most asked (question, lang) pairs of the Q&A chats, counting spelling variants together."""
+    counts = Counter()
+    first_seen = {}
+    for content, lang in store.user_questions("qa"):
+        key = (normalize(content), lang or "en")
+        counts[key] += 1
+        first_seen.setdefault(key, content)
+    return [(first_seen[key], key[1]) for key, _ in counts.most_common(limit)]
+
+
+class Warmer:
+    """Answers each question once in English and stores it in every enabled language."""
+
+    def __init__(self, cache, languages, speech=True):
+        self.cache = cache
+        self.languages = languages
+        self.speech = speech
+        self.version = cache_version(PROMPT_TEMPLATE)
+        self._english_answers = {}
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = []
+
+    def _english_answer(self, english_query):
+        # Spelling variants and other languages' phrasings of one question share a single LLM call
+        key = normalize(english_query)
+        with self._lock:
+            if key in self._english_answers:
+                return self._english_answers[key]
+        answer = rag.run_rag_chain(english_query, PROMPT_TEMPLATE)
+        with self._lock:
+            return self._english_answers.setdefault(key, answer)
+
+    def _store(self, language, question, english_answer):
+        answer = english_answer if language == "en" else translate_text(english_answer, language, source_language="en")
+        if not question or not answer:
+            return False
+        self.cache.put(self.version, language, question, answer)
+        answer_cache.publish(self.version, language, question, answer)
+        if self.speech:
+            from healthmate.text_to_speech_helper import text_to_speech
+
+            # Keyed by the text the chat page will look up, which it strips
+            text_to_speech(answer.strip(), RequestContext.for_language(language))
+        with self._lock:
+            self.written += 1
+        return True
+
+    def warm(self, question, language):
+        try:
+            english_query = question if language == "en" else translate_text(question, "en", source_language=language)
+            if not english_query:
+                raise ValueError("translation failed")
+            english_answer = self._english_answer(english_query)
+            # The question as it was asked, then as it would be typed in every other language
+            stored = self._store(language, question, english_answer)
+            for target in self.languages:
+                if target == language:
+                    continue
+                variant = english_query if target == "en" else translate_text(english_query, target, source_language="en")
+                stored = self._store(target, variant, english_answer) and stored
+            if not stored:
+                raise ValueError("some translations failed")
+        except Exception as e:
+            print(f"Error warming '{question}' ({language}): {e}")
+            with self._lock:
+                self.failed.append(question)
+
+
+def main():
+    load_dotenv()
+    # Clips go straight into the media directory; the apps serve them
+    os.environ.setdefault("HEALTHMATE_MEDIA_PORT", "0")
+
+    parser = argparse.ArgumentParser(description="Precompute answers to the top Q&A questions in every language")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--seed", metavar="FILE", help=f"seed questions, .txt or .json (default: {SEED_QUESTIONS})")
+    source.add_argument("--from-store", metavar="URL", help="chat store whose questions are the query log, e.g. sqlite:chat_sessions.db")
+    parser.add_argument("--top", type=int, default=50, help="how many questions to warm")
+    parser.add_argument("--langs", default=",".join(LANGUAGES), help="comma-separated languages to warm")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--no-speech", action="store_true", help="skip synthesizing the Listen clips")
+    parser.add_argument("--prune", action="store_true", help="drop answers warmed for older prompts, models or indexes")
+    parser.add_argument("--output", default=answer_cache.PATH, help="answer cache file (the apps read HEALTHMATE_ANSWER_CACHE)")
+    args = parser.parse_args()
+
+    languages = [lang for lang in args.langs.split(",") if lang]
+    unknown = sorted(set(languages) - set(LANGUAGES))
+    if unknown:
+        parser.error(f"unsupported languages {unknown}, expected some of {sorted(LANGUAGES)}")
+
+    if args.from_store:
+        questions = top_questions(open_store(args.from_store), args.top)
+    else:
+        questions = load_seed(args.seed or SEED_QUESTIONS)[:args.top]
+    if not questions:
+        raise SystemExit("No questions to warm.")
+
+    cache = AnswerCache(args.output)
+    warmer = Warmer(cache, languages, speech=not args.no_speech)
+    with ThreadPoolExecutor(args.workers) as pool:
+        for question, language in questions:
+            pool.submit(warmer.warm, question, language)
+    print(
+        f"Warmed {len(questions) - len(warmer.failed)}/{len(questions)} questions as {warmer.written} answers "
+        f"in {len(languages)} languages (version {warmer.version}) into {args.output}"
+    )
+    if args.prune:
+        print(f"Pruned {cache.prune([warmer.version])} answers of older versions")
+
+
+if __name__ == "__main__":
+    main()
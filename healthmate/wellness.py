@@ -0,0 +1,227 @@
+"""
+Structured user profile for the wellness coach. The age range, gender,
+activity level and goals the coach asks for are pulled out of the user's
+(English) messages once, kept per chat, and put into the prompt as a
+short summary instead of re-sending the whole conversation. A baseline
+plan is generated once per profile bucket and shared by every user in it.
+"""
+import re
+from dataclasses import dataclass, replace
+
+from healthmate import metrics, prompts, rag
+from healthmate.cache import get_cache, text_key
+
+# Messages of recent conversation that still go into the prompt next to the profile
+HISTORY_MESSAGES = 4
+
+AGE_BUCKETS = [
+    (17, "under 18"),
+    (24, "18-24"),
+    (30, "25-30"),
+    (35, "31-35"),
+    (40, "36-40"),
+    (45, "41-45"),
+    (50, "46-50"),
+    (60, "51-60"),
+]
+OLDEST_BUCKET = "61+"
+
+# Gender is only read where the user describes themselves: "I'm a 34 year old woman", "I am male",
+# "my gender is female", or a reply that is just the word, not "exercises for my boy"
+_GENDER_SELF = (
+    r"\b(?:i am|i'm|im|i’m)\s+(?:\d{2}(?:\s*(?:-|to|–)\s*\d{2})?(?:[- ]?(?:years?|yrs?)[- ]?old)?\s*,?\s*)?(?:an?\s+)?"
+    r"(?:(?!(?:of|for|with|to|and|my|the|about)\b)[\w’'-]+\s+){0,3}"
+    r"|\bmy gender is\s+|\bgender:\s*"
+)
+GENDER_WORDS = [
+    ("non-binary", r"non[- ]?binary"),
+    ("female", r"female|woman|girl|lady"),
+    ("male", r"male|man|boy|guy"),
+]
+GENDER_PATTERNS = [
+    (label, rf"(?:{_GENDER_SELF})(?:{words})\b|^\s*(?:an?\s+)?(?:{words})\s*[.!]?\s*$")
+    for label, words in GENDER_WORDS
+]
+
+# Each level is only recognized in words about exercise, so "moderate back pain" is not a level
+ACTIVITY_PATTERNS = [
+    ("highly active", r"\b(highly|very) active\b|\bathlete\b|\b(train|exercise|work out)(ing)? (daily|every day)\b"),
+    ("moderate", r"\b(moderate(ly)?|somewhat|fairly) active\b|\bmoderate (activity|exercise|workouts?)\b"
+                 r"|\bexercise (moderately|a few times a week)\b"),
+    ("sedentary", r"\bsedentary\b|\bdesk job\b|\bnot (very )?active\b|\bsit (all|most of the) day\b"),
+]
+
+GOAL_PATTERNS = [
+    ("better sleep", r"\bsleep|\binsomnia\b"),
+    ("weight management", r"\bweight\b|\blose fat\b|\bslim\b"),
+    ("stress reduction", r"\bstress|\banxiety\b|\brelax"),
+    ("fitness", r"\bfit(ness)?\b|\bexercise|\bmuscle|\bstrength\b|\bstamina\b"),
+    ("nutrition", r"\bdiet\b|\bnutrition\b|\beat(ing)? (healthy|better)\b|\bmeal plan"),
+    ("pain relief", r"\bback pain\b|\bneck pain\b|\bbody pain\b|\bposture\b"),
+    ("mindfulness", r"\bmindful|\bmeditat"),
+]
+
+# Goals are only taken from sentences that state one, not from every question that mentions sleep
+GOAL_INTENT = r"\b(want|would like|goal|trying to|help me|need to|hoping to|wish to)\b"
+
+# Ages are only read where the user states their own: "I'm 35", "aged 30-35", "my age is 41",
+# not "walk 10-15 minutes", "lose 10 to 15 kg" or "my son is 12 years old"
+_AGE_SUBJECT = r"\b(?:i am|i'm|im|i’m|aged?|my age is)\s+(?:an?\s+)?"
+_AGE_RANGE = r"(\d{2})\s*(?:-|to|–)\s*(\d{2})"
+_NOT_AN_AGE = r"(?!\s*(?:kg|kgs|kilos?|lbs?|pounds|cm|minutes?|mins?|hours?|hrs|km|miles|steps|%|percent)\b)"
+AGE_RANGE_PATTERN = _AGE_SUBJECT + _AGE_RANGE + r"\b" + _NOT_AN_AGE
+AGE_PATTERN = _AGE_SUBJECT + r"(\d{2})\b" + _NOT_AN_AGE
+
+
+@dataclass(frozen=True)
+class Profile:
+    age_range: str = None
+    gender: str = None
+    activity_level: str = None
+    goals: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(
+            age_range=data.get("age_range"),
+            gender=data.get("gender"),
+            activity_level=data.get("activity_level"),
+            goals=tuple(data.get("goals") or ()),
+        )
+
+    def to_dict(self):
+        return {
+            "age_range": self.age_range,
+            "gender": self.gender,
+            "activity_level": self.activity_level,
+            "goals": list(self.goals),
+        }
+
+    @property
+    def complete(self):
+        return bool(self.age_range and self.gender and self.activity_level and self.goals)
+
+    @property
+    def plan_profile(self):
+        """Only the fields of the bucket, so the shared plan isn't written for one member's details."""
+        return Profile(self.age_range, self.gender, self.activity_level, self.goals[:1])
+
+    @property
+    def bucket(self):
+        """The key users share a baseline plan under, or None until the profile is complete."""
+        if not self.complete:
+            return None
+        return f"{self.age_range}|{self.gender}|{self.activity_level}|{self.goals[0]}"
+
+    def merge(self, other):
+        """Take the fields other states, which are newer, and keep the rest; goals accumulate."""
+        return replace(
+            self,
+            age_range=other.age_range or self.age_range,
+            gender=other.gender or self.gender,
+            activity_level=other.activity_level or self.activity_level,
+            goals=self.goals + tuple(goal for goal in other.goals if goal not in self.goals),
+        )
+
+    def describe(self):
+        """The compact summary the prompt gets in place of the full history."""
+        known = [
+            f"Age range: {self.age_range}" if self.age_range else None,
+            f"Gender: {self.gender}" if self.gender else None,
+            f"Activity level: {self.activity_level}" if self.activity_level else None,
+            f"Goals: {', '.join(self.goals)}" if self.goals else None,
+        ]
+        missing = [
+            name for name, value in (
+                ("age range", self.age_range),
+                ("gender", self.gender),
+                ("activity level", self.activity_level),
+                ("health goals", self.goals),
+            ) if not value
+        ]
+        lines = [line for line in known if line]
+        if missing:
+            lines.append(f"Not shared yet: {', '.join(missing)}")
+        return "\n".join(lines)
+
+
+def age_bucket(age):
+    for upper, label in AGE_BUCKETS:
+        if age <= upper:
+            return label
+    return OLDEST_BUCKET
+
+
+def extract_profile(text):
+    """Pull whatever profile fields an English message states."""
+    lowered = text.lower()
+    age_range = None
+    match = re.search(AGE_RANGE_PATTERN, lowered)
+    if match:
+        # Map a stated range to the bucket of its midpoint, so buckets stay canonical
+        age_range = age_bucket((int(match.group(1)) + int(match.group(2))) // 2)
+    else:
+        match = re.search(AGE_PATTERN, lowered)
+        if match:
+            age_range = age_bucket(int(match.group(1)))
+
+    gender = next((label for label, pattern in GENDER_PATTERNS if re.search(pattern, lowered)), None)
+    activity_level = next((label for label, pattern in ACTIVITY_PATTERNS if re.search(pattern, lowered)), None)
+
+    goals = []
+    for sentence in re.split(r"[.!?\n]+", lowered):
+        if re.search(GOAL_INTENT, sentence):
+            goals.extend(label for label, pattern in GOAL_PATTERNS if re.search(pattern, sentence) and label not in goals)
+    return Profile(age_range, gender, activity_level, tuple(goals))
+
+
+def update_profile(profile, english_query):
+    """Apply what a new message states; a later statement corrects an earlier one."""
+    with metrics.span("wellness.extract"):
+        return profile.merge(extract_profile(english_query))
+
+
+def plan_fragment(profile):
+    """
+    The baseline plan for the profile's bucket, generated once per bucket
+    and shared by every chat in it (across replicas, through the cache
+    tier). Empty until the profile is complete.
+    """
+    bucket = profile.bucket
+    if bucket is None:
+        return ""
+    generated = []
+
+    def generate():
+        generated.append(True)
+        with metrics.span("wellness.plan"):
+            return rag.complete(prompts.PLAN_PROMPT, profile=profile.plan_profile.describe()).encode("utf-8")
+
+    # Concurrent users in the same bucket wait for one generation instead of each paying for it
+    key = text_key("plan", prompts.PLAN_PROMPT, rag.LLM_MODEL, bucket)
+    plan = get_cache().get_or_compute(key, generate)
+    metrics.incr("wellness_plan_cache_misses_total" if generated else "wellness_plan_cache_hits_total")
+    return bytes(plan).decode("utf-8")
+
+
+def prompt_variables(profile):
+    """The {profile} and {plan} values of the wellness prompt."""
+    return {
+        "profile": profile.describe() or "Nothing shared yet",
+        "plan": plan_fragment(profile) or "Not available until the profile is complete",
+    }
+
+
+def personalizer(profile, on_update=None):
+    """
+    The personalize hook for rag.run_rag_chain: updates profile from the
+    English query, calls on_update with the new profile if it changed and
+    returns the prompt variables.
+    """
+    def variables(english_query):
+        updated = update_profile(profile, english_query)
+        if on_update and updated != profile:
+            on_update(updated)
+        return prompt_variables(updated)
+    return variables
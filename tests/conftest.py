@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The shared package lives at the repository root, next to the module folders
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,27 @@
+import os
+
+from healthmate import answer_cache, rag
+
+
+def make_index(directory, content=b"index"):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "chroma.sqlite3"), "wb") as f:
+        f.write(content)
+    return str(directory)
+
+
+def test_version_changes_with_the_index_path(monkeypatch, tmp_path):
+    monkeypatch.setitem(rag.INDEX_DIRS, rag.RETRIEVAL, make_index(tmp_path / "pharma_db"))
+    before = answer_cache.cache_version("prompt")
+    assert answer_cache.cache_version("prompt") == before
+
+    monkeypatch.setitem(rag.INDEX_DIRS, rag.RETRIEVAL, make_index(tmp_path / "pharma_db_compact"))
+    assert answer_cache.cache_version("prompt") != before
+
+
+def test_version_changes_when_the_index_is_rebuilt_in_place(monkeypatch, tmp_path):
+    directory = make_index(tmp_path / "pharma_db")
+    monkeypatch.setitem(rag.INDEX_DIRS, rag.RETRIEVAL, directory)
+    before = answer_cache.cache_version("prompt")
+    make_index(directory, b"rebuilt index")
+    assert answer_cache.cache_version("prompt") != before
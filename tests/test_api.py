@@ -0,0 +1,35 @@
+import asyncio
+import io
+
+from aiohttp.test_utils import TestClient, TestServer
+from PIL import Image
+
+from healthmate import api, scan
+
+
+def post_scan(data, content_type="image/png"):
+    async def run():
+        async with TestClient(TestServer(api.create_app(cpu_workers=1, io_workers=1))) as client:
+            response = await client.post("/v1/scan", data=data, headers={"Content-Type": content_type})
+            return response.status, await response.json()
+    return asyncio.run(run())
+
+
+def test_scan_rejects_bytes_that_are_not_an_image(monkeypatch):
+    analyzed = []
+    monkeypatch.setattr(scan, "analyze_image", lambda *args: analyzed.append(args))
+    status, body = post_scan(b"definitely not a PNG")
+    assert status == 400
+    assert "not a readable image" in body["error"]
+    assert not analyzed
+
+
+def test_scan_backend_failure_is_a_bad_gateway(monkeypatch):
+    def fail(*args):
+        raise ConnectionError("vision model unavailable")
+
+    monkeypatch.setattr(scan, "analyze_image", fail)
+    image = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(image, format="PNG")
+    status, body = post_scan(image.getvalue())
+    assert status == 502
@@ -0,0 +1,105 @@
+import os
+import socketserver
+import threading
+import time
+
+import pytest
+
+from healthmate import cache
+from healthmate.cache import Cache, DiskBackend, MemoryBackend, RedisBackend
+
+
+def test_memory_evict_idle_drops_values_unused_for_max_idle():
+    backend = MemoryBackend(1024)
+    backend.set("a", b"x" * 10)
+    backend.set("b", b"y" * 20)
+    assert backend.evict_idle(60) == 0
+
+    time.sleep(0.05)
+    backend.get("b")
+    assert backend.evict_idle(0.04) == 10
+    assert backend.get("a") is None
+    assert backend.get("b") == b"y" * 20
+
+    assert backend.evict_idle(0) == 20
+    assert backend.size == 0
+
+
+def test_memory_evict_idle_drops_expired_values():
+    backend = MemoryBackend(1024)
+    backend.set("a", b"x" * 10, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.evict_idle(60) == 10
+
+
+def test_disk_sweep_removes_expired_files(tmp_path):
+    backend = DiskBackend(str(tmp_path))
+    backend.set("a", b"x" * 10, ttl=0.01)
+    backend.set("b", b"y" * 10)
+    time.sleep(0.02)
+    assert backend.sweep() == 18
+    assert backend.get("b") == b"y" * 10
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_disk_stays_under_its_budget_dropping_least_recently_read(tmp_path):
+    backend = DiskBackend(str(tmp_path), max_bytes=1000)
+    for key in "abc":
+        backend.set(key, b"x" * 292)
+        time.sleep(0.01)
+    backend.get("a")
+    backend.set("d", b"x" * 292)
+    assert backend.get("b") is None
+    assert all(backend.get(key) for key in "acd")
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 1000
+
+
+def test_waiter_computes_itself_once_the_lease_times_out(monkeypatch):
+    monkeypatch.setattr(cache, "LEASE_SECONDS", 0.2)
+    shared = Cache(MemoryBackend(1024))
+    # A replica that took the lease and never finished
+    shared.backend.add("lease:k", b"other", 60)
+    start = time.monotonic()
+    assert shared.get_or_compute("k", lambda: b"v") == b"v"
+    assert time.monotonic() - start >= 0.2
+
+
+def test_failing_compute_releases_the_lease():
+    shared = Cache(MemoryBackend(1024))
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        shared.get_or_compute("k", fail)
+    assert shared.backend.get("lease:k") is None
+    start = time.monotonic()
+    assert shared.get_or_compute("k", lambda: b"v") == b"v"
+    assert time.monotonic() - start < cache.LEASE_POLL_SECONDS
+
+
+class _ErrorReplies(socketserver.StreamRequestHandler):
+    def handle(self):
+        while self.rfile.readline():
+            self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def error_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _ErrorReplies)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_redis_error_reply_raises(error_server):
+    backend = RedisBackend(*error_server)
+    with pytest.raises(RuntimeError, match="ERR unknown command"):
+        backend.get("k")
+
+
+def test_cache_treats_redis_error_reply_as_a_miss(error_server):
+    shared = Cache(RedisBackend(*error_server))
+    assert shared.get("k") is None
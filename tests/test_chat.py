@@ -0,0 +1,15 @@
+from healthmate import chat, rag
+from healthmate.request_context import RequestContext
+
+
+def test_failed_answer_is_none_not_an_error_message(monkeypatch):
+    monkeypatch.setattr(rag, "run_rag_chain", lambda *args: None)
+    context = RequestContext.for_language("te")
+    assert chat.answer_query("question", context, "{question}", chat_history="🧑: hi", chat_id="chat") is None
+
+
+def test_untranslated_answer_falls_back_to_english(monkeypatch):
+    monkeypatch.setattr(rag, "run_rag_chain", lambda *args: "Drink water.")
+    monkeypatch.setattr(chat, "translate_text", lambda *args, **kwargs: None)
+    context = RequestContext.for_language("te")
+    assert chat.answer_query("question", context, "{question}", chat_history="🧑: hi", chat_id="chat") == "Drink water."
@@ -0,0 +1,80 @@
+import socket
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from healthmate import media_store
+from healthmate.media_store import _make_handler, byte_range
+
+KEY = "a" * 64
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=95-200", (95, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+])
+def test_byte_range(header, expected):
+    assert byte_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=50-10", "bytes=-0", "bytes=x-y", "items=0-5", "bytes=-"])
+def test_unsatisfiable_or_malformed_ranges(header):
+    with pytest.raises(ValueError):
+        byte_range(header, 100)
+
+
+@pytest.fixture
+def media_url(tmp_path):
+    (tmp_path / f"{KEY}.mp3").write_bytes(bytes(range(100)))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(str(tmp_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/media/{KEY}.mp3"
+    server.shutdown()
+
+
+def test_server_answers_416_past_the_end(media_url):
+    request = urllib.request.Request(media_url, headers={"Range": "bytes=500-"})
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request)
+    assert error.value.code == 416
+    assert error.value.headers["Content-Range"] == "bytes */100"
+
+
+def test_server_serves_partial_content(media_url):
+    request = urllib.request.Request(media_url, headers={"Range": "bytes=10-19"})
+    with urllib.request.urlopen(request) as response:
+        assert response.status == 206
+        assert response.headers["Content-Range"] == "bytes 10-19/100"
+        assert response.read() == bytes(range(10, 20))
+
+
+@pytest.fixture
+def fresh_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(media_store, "_store", None)
+    monkeypatch.setenv("HEALTHMATE_MEDIA_DIR", str(tmp_path))
+    for name in ("HEALTHMATE_MEDIA_BASE_URL", "HEALTHMATE_MEDIA_HOST"):
+        monkeypatch.delenv(name, raising=False)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        monkeypatch.setenv("HEALTHMATE_MEDIA_PORT", str(sock.getsockname()[1]))
+    return monkeypatch
+
+
+def test_clips_go_through_streamlit_without_a_base_url(fresh_store, tmp_path):
+    store = media_store.get_media_store()
+    assert store.base_url is None
+    assert store.url(KEY, "mp3") == str(tmp_path / f"{KEY}.mp3")
+
+
+def test_configured_base_url_is_used_as_is(fresh_store):
+    fresh_store.setenv("HEALTHMATE_MEDIA_BASE_URL", "https://health.example.org/audio/")
+    store = media_store.get_media_store()
+    assert store.base_url == "https://health.example.org/audio"
+    assert "localhost" not in store.url(KEY, "mp3")
@@ -0,0 +1,34 @@
+import pytest
+
+from healthmate.session_store import MemorySessionStore
+
+
+def test_append_after_eviction_is_rejected_and_not_held():
+    store = MemorySessionStore()
+    chat_id = store.create_chat("owner:qa", "Chat 1")
+    store.append(chat_id, "user", "hello " * 100)
+    assert store.size > 0
+
+    freed = store.evict(1)
+    assert freed > 0
+    assert store.size == 0
+    assert store.list_chats("owner:qa") == []
+
+    for _ in range(100):
+        with pytest.raises(KeyError):
+            store.append(chat_id, "user", "hello " * 100)
+    assert store.size == 0
+    assert store.recent(chat_id, 10) == []
+    assert store.count(chat_id) == 0
+
+
+def test_evict_idle_keeps_recently_used_chats():
+    store = MemorySessionStore()
+    old = store.create_chat("owner:qa", "Old")
+    store.append(old, "user", "question")
+    store.evict_idle(3600)
+    assert store.list_chats("owner:qa") == [(old, "Old")]
+
+    store.evict_idle(0)
+    assert store.list_chats("owner:qa") == []
+    assert store.size == 0
@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from PIL import Image
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+
+from healthmate import vision
+
+SPECIAL_TOKENS = ["<|begin_of_text|>", "<|eot_id|>", "<|finetune_right_pad_id|>", "<|image|>",
+                  "<|start_header_id|>", "<|end_header_id|>"]
+CHAT_TEMPLATE = (
+    "{{ bos_token }}{% for message in messages %}<|start_header_id|>{{ message['role'] }}<|end_header_id|>\n\n"
+    "{% for content in message['content'] %}{% if content['type'] == 'image' %}<|image|>"
+    "{% else %}{{ content['text'] }}{% endif %}{% endfor %}<|eot_id|>{% endfor %}"
+    "{% if add_generation_prompt %}<|start_header_id|>assistant<|end_header_id|>\n\n{% endif %}"
+)
+PROMPTS = ["Describe the scan.", "List every abnormal finding in this chest X-ray, with its severity."]
+
+
+@pytest.fixture(scope="module")
+def tiny_model_path(tmp_path_factory):
+    """A randomly initialized Llama 3.2 Vision (Mllama) model with a byte-level tokenizer, saved like the fine-tune."""
+    path = str(tmp_path_factory.mktemp("tiny_mllama"))
+    backend = Tokenizer(models.BPE(vocab={ch: i for i, ch in enumerate(pre_tokenizers.ByteLevel.alphabet())}, merges=[]))
+    backend.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    backend.decoder = decoders.ByteLevel()
+    tokenizer = transformers.PreTrainedTokenizerFast(
+        tokenizer_object=backend, bos_token=SPECIAL_TOKENS[0], eos_token=SPECIAL_TOKENS[1],
+        pad_token=SPECIAL_TOKENS[2], additional_special_tokens=SPECIAL_TOKENS[3:],
+    )
+    image_processor = transformers.MllamaImageProcessor(size={"height": 28, "width": 28}, max_image_tiles=4)
+    transformers.MllamaProcessor(image_processor, tokenizer, chat_template=CHAT_TEMPLATE).save_pretrained(path)
+    config = transformers.MllamaConfig(
+        vision_config=dict(
+            hidden_size=32, num_hidden_layers=2, num_global_layers=1, attention_heads=2, intermediate_size=64,
+            image_size=28, patch_size=14, max_num_tiles=4, intermediate_layers_indices=[0], vision_output_dim=64,
+        ),
+        text_config=dict(
+            vocab_size=len(tokenizer), hidden_size=32, num_hidden_layers=2, cross_attention_layers=[1],
+            num_attention_heads=2, num_key_value_heads=2, intermediate_size=64,
+            bos_token_id=tokenizer.bos_token_id, eos_token_id=tokenizer.eos_token_id, pad_token_id=tokenizer.pad_token_id,
+        ),
+        image_token_index=tokenizer.convert_tokens_to_ids("<|image|>"),
+    )
+    torch.manual_seed(0)
+    transformers.MllamaForConditionalGeneration(config).save_pretrained(path)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def short_reports(monkeypatch):
+    monkeypatch.setattr(vision, "MAX_NEW_TOKENS", 16)
+    # Generation samples, so fix the draws
+    torch.manual_seed(0)
+
+
+def scans():
+    return [Image.new("RGB", (40, 30), (200, 10, 10)), Image.new("RGB", (30, 50), (10, 200, 10))]
+
+
+@pytest.mark.parametrize("quantize", ["none", "int8"])
+def test_batch_streams_each_row_its_own_pieces(tiny_model_path, quantize):
+    model = vision.TransformersVisionModel(tiny_model_path, quantize=quantize)
+    requests = [(prompt, [image]) for prompt, image in zip(PROMPTS, scans())]
+    pieces = [[] for _ in requests]
+    results = model.generate(requests, lambda row, text: pieces[row].append(text))
+
+    assert len(results) == len(requests)
+    for row, ((prompt, images), result) in enumerate(zip(requests, results)):
+        assert "".join(pieces[row]) == result.content
+        assert result.output_tokens <= vision.MAX_NEW_TOKENS
+        # Left padding is masked out: each row counts only its own prompt
+        alone = model.processor(
+            images=[images], add_special_tokens=False, return_tensors="pt",
+            text=[model.processor.apply_chat_template(
+                [{"role": "user", "content": [{"type": "image"}, {"type": "text", "text": prompt}]}],
+                add_generation_prompt=True,
+            )],
+        )
+        assert result.input_tokens == alone["input_ids"].shape[1]
+    assert results[0].input_tokens < results[1].input_tokens
+
+
+def test_local_backend_batches_concurrent_scans(tiny_model_path, tmp_path):
+    model = vision.TransformersVisionModel(tiny_model_path, quantize="none")
+    batch_sizes = []
+    generate = model.generate
+    model.generate = lambda requests, on_piece: batch_sizes.append(len(requests)) or generate(requests, on_piece)
+    backend = vision.LocalBackend(model, max_batch=2, batch_wait_ms=500)
+    paths = []
+    for i, image in enumerate(scans()):
+        paths.append(str(tmp_path / f"scan{i}.png"))
+        image.save(paths[-1])
+    streamed = [[] for _ in paths]
+    results = [None] * len(paths)
+
+    def scan(i):
+        results[i] = backend.generate(PROMPTS[i], [paths[i]], streamed[i].append)
+
+    threads = [threading.Thread(target=scan, args=(i,)) for i in range(len(paths))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=120)
+    for i, result in enumerate(results):
+        assert result is not None
+        assert "".join(streamed[i]) == result.content
+    assert results[0].input_tokens < results[1].input_tokens
+    assert batch_sizes == [2]
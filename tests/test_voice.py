@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from healthmate import voice
+
+SPEECH_DBFS = -20
+
+
+def noise(seconds, dbfs, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * voice.SAMPLE_RATE)) * 32768 * 10 ** (dbfs / 20)).astype(np.int16)
+
+
+@pytest.mark.parametrize("room_dbfs", [-70, -55, -40])
+def test_trims_room_noise_around_speech(room_dbfs):
+    samples = np.concatenate([noise(2, room_dbfs), noise(2, SPEECH_DBFS, 1), noise(2, room_dbfs, 2)])
+    kept = len(voice.trim_silence(samples)) / voice.SAMPLE_RATE
+    # The speech plus the padding on either side, give or take the frames it starts and ends in
+    assert 2 <= kept <= 2 + 2 * (voice.PAD_FRAMES + 2) * voice.FRAME_SAMPLES / voice.SAMPLE_RATE
+
+
+def test_keeps_speech_at_the_start_of_a_recording():
+    samples = np.concatenate([noise(2, SPEECH_DBFS), noise(2, -40, 1)])
+    assert len(voice.trim_silence(samples)) / voice.SAMPLE_RATE >= 2
+
+
+def test_room_noise_alone_is_dropped():
+    assert len(voice.trim_silence(noise(3, -40))) == 0
+
+
+def test_vosk_falls_back_to_google_without_models(monkeypatch, tmp_path, capsys):
+    class Google:
+        pass
+
+    monkeypatch.setattr(voice, "ENGINE", "vosk")
+    monkeypatch.setattr(voice, "VOSK_MODELS", str(tmp_path))
+    monkeypatch.setattr(voice, "_engine", None)
+    monkeypatch.setitem(voice.ENGINES, "google", Google)
+    assert not voice.vosk_models_installed()
+    assert isinstance(voice.get_engine(), Google)
+    assert "falls back to the Google Web Speech API" in capsys.readouterr().out
+
+
+def test_vosk_falls_back_to_google_without_the_package(monkeypatch, tmp_path, capsys):
+    class Google:
+        pass
+
+    def missing_vosk():
+        raise ImportError("No module named 'vosk'")
+
+    (tmp_path / "en").mkdir()
+    monkeypatch.setattr(voice, "ENGINE", "vosk")
+    monkeypatch.setattr(voice, "VOSK_MODELS", str(tmp_path))
+    monkeypatch.setattr(voice, "_engine", None)
+    monkeypatch.setitem(voice.ENGINES, "vosk", missing_vosk)
+    monkeypatch.setitem(voice.ENGINES, "google", Google)
+    assert isinstance(voice.get_engine(), Google)
+    assert "vosk package is not installed" in capsys.readouterr().out
@@ -0,0 +1,89 @@
+import pytest
+
+from healthmate import wellness
+from healthmate.wellness import Profile, extract_profile, update_profile
+
+
+@pytest.mark.parametrize("text", [
+    "I walk 10-15 minutes a day",
+    "I want to lose 10 to 15 kg",
+    "My son is 12 years old",
+    "I am 80 kg and want to slim down",
+])
+def test_numbers_that_are_not_the_users_age(text):
+    assert extract_profile(text).age_range is None
+
+
+@pytest.mark.parametrize("text, age_range", [
+    ("I'm 35", "31-35"),
+    ("I am 27 years old", "25-30"),
+    ("I'm aged 30-35", "31-35"),
+    ("My age is 62", "61+"),
+])
+def test_stated_ages(text, age_range):
+    assert extract_profile(text).age_range == age_range
+
+
+def test_moderate_pain_is_not_an_activity_level():
+    assert extract_profile("I have moderate back pain").activity_level is None
+
+
+@pytest.mark.parametrize("text, level", [
+    ("I'm moderately active", "moderate"),
+    ("I exercise a few times a week", "moderate"),
+    ("I have a desk job", "sedentary"),
+    ("I train every day", "highly active"),
+])
+def test_activity_levels(text, level):
+    assert extract_profile(text).activity_level == level
+
+
+def test_later_statement_replaces_earlier_one():
+    profile = Profile("31-35", "female", "sedentary", ("fitness",))
+    updated = update_profile(profile, "Actually I'm 42 and I'm fairly active now")
+    assert updated.age_range == "41-45"
+    assert updated.activity_level == "moderate"
+    assert updated.gender == "female"
+    assert updated.goals == ("fitness",)
+
+
+@pytest.mark.parametrize("text", [
+    "Exercises for my boy",
+    "My wife is a woman who loves yoga",
+    "I'm worried my boy is not very active",
+    "The man at the gym said I should stretch",
+    "I am a manager with a desk job",
+])
+def test_genders_that_are_not_the_users(text):
+    assert extract_profile(text).gender is None
+
+
+@pytest.mark.parametrize("text, gender", [
+    ("I'm a 34 year old woman", "female"),
+    ("I am male", "male"),
+    ("I'm 28, female and sedentary", "female"),
+    ("I am 31-35, male, and my routine is sedentary.", "male"),
+    ("I am a very active guy", "male"),
+    ("My gender is non-binary", "non-binary"),
+    ("Female", "female"),
+])
+def test_stated_genders(text, gender):
+    assert extract_profile(text).gender == gender
+
+
+def test_profiles_in_one_bucket_get_the_same_plan_prompt(monkeypatch):
+    prompts = []
+
+    class Uncached:
+        def get_or_compute(self, key, compute):
+            return compute()
+
+    monkeypatch.setattr(wellness, "get_cache", Uncached)
+    monkeypatch.setattr(wellness.rag, "complete", lambda template, **values: prompts.append(values) or "plan")
+    first = Profile("31-35", "female", "moderate", ("better sleep", "nutrition"))
+    second = Profile("31-35", "female", "moderate", ("better sleep", "stress reduction", "fitness"))
+    assert first.bucket == second.bucket
+    wellness.plan_fragment(first)
+    wellness.plan_fragment(second)
+    assert prompts[0] == prompts[1]
+    assert "nutrition" not in prompts[0]["profile"]